@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import metrics, slowlog
+
+        connection_created.connect(slowlog.install_hook)
+        if settings.METRICS_ENABLED:
+            connection_created.connect(metrics.install_sql_hook)
+            metrics.instrument_templates()
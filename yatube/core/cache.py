@@ -0,0 +1,105 @@
+"""Чтение горячих ключей кэша без «набегов» при пересчёте.
+
+Когда запись устаревает, пересчитывает её только тот, кто первым взял
+блокировку в самом кэше (``cache.add`` атомарен во всех бэкендах).
+Остальные тем временем получают прежнее значение, а если его нет —
+недолго ждут, пока владелец блокировки положит новое.
+
+Записи хранятся вместе со сроком годности и временем расчёта: по ним
+можно пересчитывать значение чуть раньше срока (XFetch), чтобы под
+нагрузкой запись обновлялась до того, как истечёт у всех сразу.
+"""
+import math
+import random
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+LOCK_KEY = '{}:lock'
+POLL_INTERVAL = 0.05
+
+
+def is_due(expires_at, delta, beta, now):
+    """Пора ли пересчитывать запись со сроком expires_at.
+
+    При beta > 0 срок сдвигается на случайную долю времени расчёта
+    delta: чем дороже значение, тем раньше его начинают обновлять.
+    """
+    if expires_at is None:
+        return False
+    if beta:
+        now -= delta * beta * math.log(1.0 - random.random())
+    return now >= expires_at
+
+
+def get_or_compute(key, compute, timeout, cache=None, beta=None,
+                   cacheable=None, raw=False):
+    """Значение из кэша или результат compute(), посчитанный одним вызовом.
+
+    ``cacheable(value)`` отбрасывает значения, которые нельзя сохранять.
+    С ``raw=True`` значение хранится как есть (например, для cache.incr):
+    защищается только промах, без раннего пересчёта и старых копий.
+    """
+    cache = cache or default_cache
+    if timeout == 0:
+        return compute()
+    if beta is None:
+        beta = settings.CACHE_EARLY_RECOMPUTE_BETA
+    entry = cache.get(key)
+    if entry is not None:
+        if raw:
+            return entry
+        value, expires_at, delta = entry
+        if not is_due(expires_at, delta, beta, time.time()):
+            return value
+    # Блокировки живут только в общем ярусе двухуровневого кэша: их
+    # снятие не должно сбрасывать локальные копии во всех процессах.
+    locks = getattr(cache, 'shared', cache)
+    lock_key = LOCK_KEY.format(key)
+    token = uuid4().hex
+    if locks.add(lock_key, token, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            return store(key, compute, timeout, cache, cacheable, raw)
+        finally:
+            if locks.get(lock_key) == token:
+                locks.delete(lock_key)
+    if entry is None:
+        entry = wait(key, lock_key, cache, locks)
+    if entry is None:
+        return compute()
+    return entry if raw else entry[0]
+
+
+def wait(key, lock_key, cache, locks):
+    """Ждёт значение, которое считает владелец блокировки."""
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if locks.get(lock_key) is None:
+            # Владелец закончил, но сохранять было нечего.
+            return None
+    return None
+
+
+def store(key, compute, timeout, cache, cacheable, raw):
+    started = time.monotonic()
+    value = compute()
+    if cacheable is not None and not cacheable(value):
+        return value
+    if raw:
+        cache.add(key, value, timeout)
+        return value
+    delta = time.monotonic() - started
+    if timeout is None:
+        cache.set(key, (value, None, delta), None)
+    else:
+        # Запись живёт дольше своего срока, чтобы во время пересчёта
+        # остальным было что отдать.
+        cache.set(key, (value, time.time() + timeout, delta),
+                  timeout + settings.CACHE_STALE_GRACE)
+    return value
@@ -0,0 +1,441 @@
+"""Кэш, общий для всех процессов-обработчиков, и локальный ярус перед ним.
+
+``SQLiteCache`` хранит записи в отдельном файле SQLite: его видят все
+воркеры на машине, а ``add`` и ``incr`` атомарны между процессами, так
+что блокировки ``core.cache`` работают и здесь.
+
+``TwoTierCache`` держит перед общим кэшем ограниченный LRU в памяти
+процесса. Каждая запись через него публикует в общем кэше изменение
+с номером и именем ключа; процессы читают новые изменения не чаще
+раза в POLL_INTERVAL секунд и выбрасывают из своих ярусов только эти
+ключи.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+)
+# Номер последнего изменения, метка «поколения» общего кэша (меняется
+# после его очистки) и сами изменения — кортежи изменённых ключей.
+SEQ_KEY = 'twotier:seq'
+EPOCH_KEY = 'twotier:epoch'
+CHANGE_KEY = 'twotier:change:{}'
+# Ключ, означающий «сбросить ярус целиком».
+EVERYTHING = '*'
+# Отставшему сильнее процессу дешевле сбросить ярус, чем читать журнал.
+MAX_CHANGES = 500
+# Проверять переполнение раз на столько записей, а не на каждую.
+CULL_EVERY = 100
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, путь к которому задаёт LOCATION."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self.local = threading.local()
+        self.writes = 0
+
+    @property
+    def db(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            # LOCATION вида file:name?mode=memory&cache=shared — база
+            # в памяти, общая для потоков процесса (для тестов).
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                 uri=self.path.startswith('file:'))
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(SCHEMA)
+            self.local.db = db
+        return db
+
+    def key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self.db.execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        return {key: value for key, (value, _) in
+                self.get_many_ttl(keys, version=version).items()}
+
+    def get_many_ttl(self, keys, version=None):
+        """Как get_many, но значение — пара (значение, секунд до срока).
+
+        Для бессрочной записи вместо срока None.
+        """
+        made = {self.key(key, version): key for key in keys}
+        if not made:
+            return {}
+        marks = ', '.join('?' * len(made))
+        now = time.time()
+        rows = self.db.execute(
+            f'SELECT key, value, expires FROM cache WHERE key IN ({marks}) '
+            'AND (expires IS NULL OR expires > ?)',
+            [*made, now],
+        )
+        return {
+            made[key]: (pickle.loads(value),
+                        None if expires is None else expires - now)
+            for key, value, expires in rows
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.db.execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+            (self.key(key, version), pickle.dumps(value, -1),
+             self.get_backend_timeout(timeout)),
+        )
+        self.cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        with self.transaction() as db:
+            db.execute('DELETE FROM cache WHERE key = ? AND expires <= ?',
+                       (key, time.time()))
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, -1), expires),
+            ).rowcount
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return bool(self.db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), self.key(key, version),
+             time.time()),
+        ).rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        made = self.key(key, version)
+        with self.transaction() as db:
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (made, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute('UPDATE cache SET value = ? WHERE key = ?',
+                       (pickle.dumps(value, -1), made))
+        return value
+
+    def delete(self, key, version=None):
+        self.db.execute('DELETE FROM cache WHERE key = ?',
+                        (self.key(key, version),))
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def clear(self):
+        self.db.execute('DELETE FROM cache')
+
+    def cull(self):
+        # Как и встроенные бэкенды, при переполнении удаляем истёкшие
+        # записи и каждую CULL_FREQUENCY-ю из оставшихся: сперва те,
+        # что истекут раньше, бессрочные — последними. Размер таблицы
+        # проверяется раз в CULL_EVERY записей, так что MAX_ENTRIES —
+        # мягкий предел.
+        self.writes += 1
+        if self.writes % CULL_EVERY:
+            return
+        db = self.db
+        if db.execute('SELECT COUNT(*) FROM cache').fetchone()[0] \
+                <= self._max_entries:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        if self._cull_frequency:
+            db.execute(
+                'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache '
+                'ORDER BY expires IS NULL, expires '
+                'LIMIT (SELECT COUNT(*) FROM cache) / ?)',
+                (self._cull_frequency,),
+            )
+        else:
+            db.execute('DELETE FROM cache')
+
+    def transaction(self):
+        return _Immediate(self.db)
+
+
+class _Immediate:
+    """Транзакция, сразу берущая блокировку записи на файл."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+class LocalTier:
+    """LRU процесса: ключ — (сериализованное значение, срок).
+
+    ``seen`` — номер последнего учтённого изменения общего кэша. Значение,
+    прочитанное до того, как ярус учёл новые изменения, не сохраняется:
+    оно могло устареть, пока его читали.
+    """
+
+    def __init__(self, max_entries, timeout, interval):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.interval = interval
+        self.epoch = None
+        self.seen = None
+        self.checked = float('-inf')
+        self.lock = threading.Lock()
+        self.refreshing = threading.Lock()
+
+    def refresh(self, shared):
+        """Учитывает новые изменения не чаще раза в interval секунд."""
+        if time.monotonic() - self.checked < self.interval:
+            return self.seen
+        # Журнал читает один поток; остальные пока работают с ярусом.
+        if not self.refreshing.acquire(blocking=False):
+            return self.seen
+        try:
+            self.apply(shared)
+        finally:
+            self.refreshing.release()
+        return self.seen
+
+    def apply(self, shared):
+        found = shared.get_many([EPOCH_KEY, SEQ_KEY])
+        epoch = found.get(EPOCH_KEY)
+        if epoch is None:
+            shared.add(EPOCH_KEY, uuid4().hex, None)
+            epoch = shared.get(EPOCH_KEY)
+        seq = found.get(SEQ_KEY, 0)
+        seen = self.seen
+        keys = None
+        if epoch == self.epoch and seen is not None:
+            if seq == seen:
+                keys = ()
+            elif 0 < seq - seen <= MAX_CHANGES:
+                numbers = range(seen + 1, seq + 1)
+                changes = shared.get_many(
+                    [CHANGE_KEY.format(number) for number in numbers])
+                # Пропавшее изменение (истекло или вытеснено) неизвестно
+                # какое: надёжнее сбросить всё.
+                if len(changes) == len(numbers):
+                    keys = {key for change in changes.values()
+                            for key in change}
+        with self.lock:
+            if keys is None or EVERYTHING in keys or self.seen != seen:
+                self.entries.clear()
+            else:
+                for key in keys:
+                    self.entries.pop(key, None)
+            self.epoch = epoch
+            self.seen = seq
+            self.checked = time.monotonic()
+
+    def published(self, seq, keys):
+        """Своё изменение: выбрасывает ключи, не дожидаясь журнала."""
+        with self.lock:
+            if EVERYTHING in keys:
+                self.entries.clear()
+            else:
+                for key in keys:
+                    self.entries.pop(key, None)
+            # Если между учтённым и своим изменений не было, журнал
+            # можно не перечитывать.
+            if self.seen is not None and seq == self.seen + 1:
+                self.seen = seq
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            data, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return data
+
+    def put(self, key, value, timeout, seen):
+        if timeout is not None:
+            timeout = min(timeout, self.timeout)
+        else:
+            timeout = self.timeout
+        if timeout <= 0:
+            return
+        data = pickle.dumps(value, -1)
+        with self.lock:
+            if seen is None or seen != self.seen:
+                return
+            self.entries[key] = (data, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """LRU процесса перед общим кэшем из CACHES[OPTIONS['SHARED']].
+
+    OPTIONS: SHARED — имя общего кэша (SQLiteCache), LOCAL_TIMEOUT —
+    сколько секунд запись живёт в процессе (но не дольше, чем в общем
+    кэше), POLL_INTERVAL — как часто читать журнал изменений (столько же,
+    в худшем случае, воркер видит чужое изменение), CHANGE_TIMEOUT —
+    сколько хранится запись журнала.
+    MAX_ENTRIES ограничивает размер локального яруса.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.shared_alias = options.pop('SHARED')
+        local_timeout = options.pop('LOCAL_TIMEOUT', 60)
+        interval = options.pop('POLL_INTERVAL', 1)
+        self.change_timeout = options.pop('CHANGE_TIMEOUT', 300)
+        super().__init__(dict(params, OPTIONS=options))
+        # Экземпляры бэкенда создаются на каждый поток, а ярус общий
+        # для процесса, как хранилище LocMemCache.
+        with _tiers_lock:
+            self.tier = _tiers.setdefault(location, LocalTier(
+                self._max_entries, local_timeout, interval))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def seconds(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def publish(self, keys):
+        """Записывает изменение ключей в журнал общего кэша."""
+        shared = self.shared
+        try:
+            seq = shared.incr(SEQ_KEY)
+        except ValueError:
+            shared.add(SEQ_KEY, 0, None)
+            seq = shared.incr(SEQ_KEY)
+        keys = tuple(keys)
+        shared.set(CHANGE_KEY.format(seq), keys, self.change_timeout)
+        self.tier.published(seq, keys)
+
+    def get(self, key, default=None, version=None):
+        made = self.key(key, version)
+        seen = self.tier.refresh(self.shared)
+        data = self.tier.get(made)
+        if data is not None:
+            metrics.cache_lookup(key, True)
+            return pickle.loads(data)
+        found = self.shared.get_many_ttl([key], version=version)
+        metrics.cache_lookup(key, key in found)
+        if key not in found:
+            return default
+        # Локальная копия не переживает запись в общем кэше.
+        value, remaining = found[key]
+        self.tier.put(made, value, remaining, seen)
+        return value
+
+    def get_many(self, keys, version=None):
+        seen = self.tier.refresh(self.shared)
+        found, missing = {}, []
+        for key in keys:
+            data = self.tier.get(self.key(key, version))
+            if data is None:
+                missing.append(key)
+            else:
+                metrics.cache_lookup(key, True)
+                found[key] = pickle.loads(data)
+        if missing:
+            fetched = self.shared.get_many_ttl(missing, version=version)
+            for key in missing:
+                metrics.cache_lookup(key, key in fetched)
+            for key, (value, remaining) in fetched.items():
+                self.tier.put(self.key(key, version), value, remaining, seen)
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.seconds(timeout)
+        made = self.key(key, version)
+        # Изменение публикуется и для новых ключей: запись, вытесненная
+        # из общего кэша, могла остаться в чужих ярусах.
+        self.tier.refresh(self.shared)
+        self.shared.set(key, value, timeout, version=version)
+        self.publish([made])
+        self.tier.put(made, value, timeout, self.tier.seen)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.seconds(timeout)
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        made = self.key(key, version)
+        self.tier.refresh(self.shared)
+        self.publish([made])
+        self.tier.put(made, value, timeout, self.tier.seen)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, self.seconds(timeout), version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self.publish([self.key(key, version)])
+        return value
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self.publish([self.key(key, version)])
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        self.publish([self.key(key, version) for key in keys])
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def clear(self):
+        self.shared.clear()
+        self.publish([EVERYTHING])
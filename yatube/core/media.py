@@ -0,0 +1,141 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+# Имена миниатюр и картинок постов — хэши содержимого: файл под таким
+# именем никогда не меняется и может кэшироваться навсегда.
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{32,64}\.\w+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def get_etag(stat):
+    return quote_etag(f'{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def parse_range(header, size):
+    """Возвращает (начало, конец) одного диапазона байт или None.
+
+    Несколько диапазонов сразу не поддерживаются: на такой запрос
+    отдаётся весь файл, как разрешает RFC 7233. ValueError означает
+    диапазон за пределами файла.
+    """
+    match = RANGE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def guess_type(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    return content_type or 'application/octet-stream', encoding
+
+
+def accel_response(path, full_path):
+    """Ответ, передающий отдачу файла фронт-серверу, или None."""
+    mode = settings.MEDIA_ACCEL
+    if mode == 'x-accel-redirect':
+        header = 'X-Accel-Redirect'
+        value = settings.MEDIA_ACCEL_PREFIX + quote(path)
+    elif mode == 'x-sendfile':
+        header, value = 'X-Sendfile', full_path
+    else:
+        return None
+    response = HttpResponse(content_type=guess_type(full_path)[0])
+    response[header] = value
+    return response
+
+
+def file_response(request, full_path, stat):
+    content_type, encoding = guess_type(full_path)
+    size = stat.st_size
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (if_range is None or if_range == get_etag(stat)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'),
+                                content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(full_path, start, end - start + 1),
+            status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Отдаёт файл из MEDIA_ROOT с валидаторами и долгим кэшированием.
+
+    Если настроен фронт-сервер (MEDIA_ACCEL), сами байты отдаёт он,
+    а Django только проверяет путь и условные заголовки.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404(path)
+    if not os.path.isfile(full_path):
+        raise Http404(path)
+    etag = get_etag(stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = accel_response(path, full_path) or file_response(
+            request, full_path, stat)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if HASHED_NAME.search(path):
+        response['Cache-Control'] = IMMUTABLE
+    else:
+        response['Cache-Control'] = (
+            f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}')
+    return response
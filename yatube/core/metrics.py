@@ -0,0 +1,270 @@
+"""Метрики запросов в формате Prometheus.
+
+Каждый процесс копит счётчики и гистограммы в памяти: время ответа,
+число и время SQL-запросов, время отрисовки шаблонов по view, попадания
+в кэш по префиксу ключа, время создания миниатюр. Раз в
+``METRICS_FLUSH_INTERVAL`` секунд процесс кладёт свой снимок в общий кэш
+под собственным номером, а ``/metrics`` отдаёт снимки всех воркеров.
+Сбор стоит пары вызовов ``perf_counter`` на запрос, SQL-запрос и
+отрисовку страницы.
+
+Снимки не складываются: у каждой серии есть метка ``worker`` с номером
+процесса. Перезапуск воркера и истечение снимка умершего процесса для
+Prometheus — сброс или конец одной серии, а не падение общей суммы;
+складывает серии уже запрос, например ``sum by (view) (rate(...))``.
+Номера выдаются счётчиком в отдельном кэше ``METRICS_CACHE``, где
+кроме снимков ничего нет, поэтому вытеснение ему не грозит.
+"""
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+
+SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Имя метрики: тип, описание и границы корзин гистограммы.
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Ответы по view и коду статуса.', None),
+    'yatube_request_seconds': (
+        'histogram', 'Время ответа.', SECONDS),
+    'yatube_request_queries': (
+        'histogram', 'Число SQL-запросов на ответ.', QUERIES),
+    'yatube_request_sql_seconds': (
+        'histogram', 'Время SQL-запросов на ответ.', SECONDS),
+    'yatube_request_render_seconds': (
+        'histogram', 'Время отрисовки шаблонов на ответ.', SECONDS),
+    'yatube_cache_requests_total': (
+        'counter', 'Чтения кэша по префиксу ключа: hit или miss.', None),
+    'yatube_thumbnail_seconds': (
+        'histogram', 'Время создания миниатюр одной картинки.', SECONDS),
+}
+SLOTS_KEY = 'metrics:slots'
+WORKER_KEY = 'metrics:worker:{}'
+# posts:count:group:3 → posts:count, pagecache:1f0e… → pagecache.
+PREFIX = re.compile(r'[a-z_]+(?:[:.][a-z_]+(?=[:.]|$))?')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_local = threading.local()
+
+
+class Registry:
+    """Счётчики и гистограммы процесса.
+
+    Значение счётчика — число, гистограммы — [счёт по корзинам, сумма];
+    последняя корзина — +Inf.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.slot = None
+        self.flushed = time.monotonic()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.slot = None
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        index = bisect_left(buckets, value)
+        key = (name, labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(buckets) + 1), 0]
+            state[0][index] += 1
+            state[1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: [list(value[0]), value[1]]
+                if isinstance(value, list) else value
+                for key, value in self.values.items()
+            }
+
+    def flush(self):
+        """Кладёт снимок процесса в общий кэш под номером воркера."""
+        shared = caches[settings.METRICS_CACHE]
+        timeout = settings.METRICS_WORKER_TIMEOUT
+        if self.slot is None:
+            # add не даст занять номер живого воркера, даже если счётчик
+            # номеров пропал вместе с очисткой кэша.
+            while True:
+                shared.add(SLOTS_KEY, 0, None)
+                slot = shared.incr(SLOTS_KEY)
+                if shared.add(WORKER_KEY.format(slot), {}, timeout):
+                    self.slot = slot
+                    break
+        shared.set(WORKER_KEY.format(self.slot), self.snapshot(), timeout)
+        self.flushed = time.monotonic()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+
+registry = Registry()
+# Дочерний процесс начинает со своих нулей, а не с копии родителя.
+os.register_at_fork(after_in_child=registry.reset)
+
+
+class RequestState:
+    __slots__ = ('queries', 'sql', 'render', 'rendering')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.render = 0.0
+        self.rendering = False
+
+
+def current():
+    return getattr(_local, 'state', None)
+
+
+def start():
+    _local.state = RequestState()
+    return _local.state
+
+
+def finish(view, status, elapsed):
+    state = _local.state
+    _local.state = None
+    labels = (('view', view),)
+    registry.inc('yatube_requests_total',
+                 labels + (('status', str(status)),))
+    registry.observe('yatube_request_seconds', labels, elapsed)
+    registry.observe('yatube_request_queries', labels, state.queries)
+    registry.observe('yatube_request_sql_seconds', labels, state.sql)
+    registry.observe('yatube_request_render_seconds', labels, state.render)
+    registry.maybe_flush()
+
+
+def record_sql(execute, sql, params, many, context):
+    """Обёртка курсора (connection.execute_wrappers) для всех соединений."""
+    state = current()
+    if state is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state.queries += 1
+        state.sql += time.perf_counter() - started
+
+
+def install_sql_hook(sender, connection, **kwargs):
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+def instrument_templates():
+    """Считает время внешней отрисовки шаблона; вложенные не суммируются."""
+    from django.template.base import Template
+
+    original = Template.render
+    if getattr(original, 'metrics', False):
+        return
+
+    def render(self, context):
+        state = current()
+        if state is None or state.rendering:
+            return original(self, context)
+        state.rendering = True
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            state.render += time.perf_counter() - started
+            state.rendering = False
+
+    render.metrics = True
+    Template.render = render
+
+
+def cache_prefix(key):
+    match = PREFIX.match(key)
+    return match.group() if match else 'other'
+
+
+def cache_lookup(key, hit):
+    if settings.METRICS_ENABLED:
+        registry.inc('yatube_cache_requests_total', (
+            ('prefix', cache_prefix(key)),
+            ('result', 'hit' if hit else 'miss'),
+        ))
+
+
+def observe(name, value, labels=()):
+    if settings.METRICS_ENABLED:
+        registry.observe(name, labels, value)
+
+
+def collect():
+    """Снимки всех живых воркеров, включая свежий снимок текущего.
+
+    Ключ серии дополняется меткой ``worker``, так что серии разных
+    процессов не смешиваются.
+    """
+    registry.flush()
+    shared = caches[settings.METRICS_CACHE]
+    slots = max(shared.get(SLOTS_KEY) or 0, registry.slot)
+    keys = {WORKER_KEY.format(slot): str(slot)
+            for slot in range(1, slots + 1)}
+    values = {}
+    for key, snapshot in shared.get_many(list(keys)).items():
+        worker = (('worker', keys[key]),)
+        for (name, labels), value in snapshot.items():
+            values[name, labels + worker] = value
+    return values
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(values):
+    """Текстовый формат Prometheus 0.0.4."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted(
+            (labels, value) for (metric, labels), value in values.items()
+            if metric == name)
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    name, _labels(labels + (('le', str(bound)),)),
+                    cumulative))
+            lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,132 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+
+from . import metrics, pagecache, slowlog
+from .cache import get_or_compute
+from .queries import QueryRecorder
+
+logger = logging.getLogger('core.queries')
+
+
+class RepeatedQueriesMiddleware:
+    """Находит N+1: одинаковые по форме запросы внутри одного запроса.
+
+    Предназначен для разработки и стенда, включается настройкой
+    ``NPLUSONE_DETECTION``. Найденные группы пишутся в лог ``core.queries``
+    вместе со строками шаблонов, откуда они пришли, а их число
+    возвращается в заголовке ``X-Repeated-Queries``.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NPLUSONE_DETECTION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 3)
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+            # Шаблонный ответ дорисовывается здесь же, чтобы его
+            # запросы тоже попали в запись.
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+        repeated = recorder.repeated(self.threshold)
+        if repeated:
+            response['X-Repeated-Queries'] = str(len(repeated))
+            for shape, queries in repeated.items():
+                origins = sorted({
+                    query.origin or 'вне шаблона' for query in queries})
+                logger.warning(
+                    '%s: запрос выполнен %d раз из %s\n%s',
+                    request.path, len(queries), ', '.join(origins), shape,
+                )
+        return response
+
+
+class MetricsMiddleware:
+    """Собирает метрики ответа для ``/metrics`` (см. ``core.metrics``).
+
+    Стоит первым, чтобы время ответа включало остальные middleware
+    и ответы из кэша страниц.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.start()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            match = getattr(request, 'resolver_match', None)
+            metrics.finish(match.view_name if match else 'unresolved',
+                           status, time.perf_counter() - started)
+
+
+class SlowQueryMiddleware:
+    """Даёт журналу медленных запросов знать view и адрес запроса."""
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slowlog.set_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            slowlog.set_request(None)
+
+
+class AnonymousPageCacheMiddleware:
+    """Отдаёт анонимным посетителям готовые страницы из кэша.
+
+    Стоит в начале цепочки, до сессий и аутентификации: попадание в кэш
+    обходится без них, контекст-процессоров и шаблонов. Кэшируются
+    только view, помеченные ``pagecache.cache_anonymous``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ANONYMOUS_PAGE_CACHE_TIMEOUT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.method not in ('GET', 'HEAD')
+                or not pagecache.is_anonymous(request)):
+            return self.get_response(request)
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return self.get_response(request)
+        versions = getattr(match.func, 'page_cache_versions', None)
+        if versions is None:
+            return self.get_response(request)
+        # По нему MetricsMiddleware узнаёт view и для ответа из кэша.
+        request.resolver_match = match
+        key = pagecache.make_key(request, versions(*match.args,
+                                                   **match.kwargs))
+        # Остальные анонимы, пришедшие за той же страницей, пока она
+        # рисуется, получают прежнюю копию или ждут готовую.
+        response = get_or_compute(
+            key, lambda: self.get_response(request),
+            settings.ANONYMOUS_PAGE_CACHE_TIMEOUT, cache=cache,
+            cacheable=pagecache.is_cacheable,
+        )
+        if response.status_code != 200:
+            return response
+        return get_conditional_response(
+            request, etag=response.get('ETag'), response=response)
@@ -0,0 +1,46 @@
+"""Кэш целых страниц для анонимных посетителей.
+
+View помечается декоратором ``cache_anonymous``: ему передаётся функция,
+которая по аргументам URL возвращает метки версий данных страницы.
+Метки входят в ключ, поэтому изменение данных просто уводит страницу
+на новый ключ, а старая запись истекает сама.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.translation import get_language_from_request
+
+KEY_PREFIX = 'pagecache:'
+
+
+def cache_anonymous(versions):
+    def decorator(view):
+        view.page_cache_versions = versions
+        return view
+    return decorator
+
+
+def is_anonymous(request):
+    # Проверка идёт до сессий и аутентификации: без cookie сессии
+    # пользователь заведомо не вошёл.
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def make_key(request, versions):
+    parts = [
+        request.get_host(),
+        request.get_full_path(),
+        get_language_from_request(request),
+        *map(str, versions),
+    ]
+    digest = hashlib.md5('\n'.join(parts).encode()).hexdigest()
+    return KEY_PREFIX + digest
+
+
+def is_cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+    )
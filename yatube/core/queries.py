@@ -0,0 +1,147 @@
+"""Запись SQL-запросов с местом их появления в шаблонах."""
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ContextDecorator, ExitStack
+
+from django.db import connections
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize(sql):
+    """Форма запроса: без литералов и с любым числом значений в IN."""
+    sql = IN_LIST.sub('IN (...)', sql)
+    return LITERAL.sub('?', ' '.join(sql.split()))
+
+
+def template_origin():
+    """Шаблон и строка, при отрисовке которых выполняется запрос."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                name = origin.template_name or origin.name
+                return f'{name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class RecordedQuery:
+    __slots__ = ('sql', 'params', 'duration', 'origin', 'alias')
+
+    def __init__(self, sql, params, duration, origin, alias):
+        self.sql = sql
+        self.params = params
+        self.duration = duration
+        self.origin = origin
+        self.alias = alias
+
+    @property
+    def shape(self):
+        return normalize(self.sql)
+
+
+class QueryRecorder:
+    """Контекстный менеджер, записывающий все запросы ко всем базам."""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(RecordedQuery(
+                sql, params, time.perf_counter() - started,
+                template_origin(), context['connection'].alias,
+            ))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def duration(self):
+        return sum(query.duration for query in self.queries)
+
+    def repeated(self, threshold):
+        """Группы запросов одной формы, повторённые threshold раз и более."""
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[query.shape].append(query)
+        return {
+            shape: queries for shape, queries in groups.items()
+            if len(queries) >= threshold
+        }
+
+    def report(self, queries=None):
+        lines = []
+        for query in self.queries if queries is None else queries:
+            origin = query.origin or 'вне шаблона'
+            lines.append(
+                f'{query.duration * 1000:8.2f} мс  [{origin}]  {query.sql}')
+        return '\n'.join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget(ContextDecorator):
+    """Бюджет блока кода: не больше queries запросов и ms миллисекунд SQL.
+
+    Работает как контекстный менеджер и как декоратор теста. При
+    превышении падает со списком запросов и строками шаблонов, откуда
+    они пришли.
+    """
+
+    def __init__(self, queries=None, ms=None, label=''):
+        self.queries = queries
+        self.ms = ms
+        self.label = label
+        self.recorder = None
+
+    def __enter__(self):
+        self.recorder = QueryRecorder().__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, *exc_info):
+        self.recorder.__exit__(exc_type, *exc_info)
+        if exc_type is None:
+            self.check(self.recorder)
+
+    def check(self, recorder):
+        problems = []
+        if self.queries is not None and len(recorder.queries) > self.queries:
+            problems.append(
+                f'запросов {len(recorder.queries)}, бюджет {self.queries}')
+        elapsed = recorder.duration * 1000
+        if self.ms is not None and elapsed > self.ms:
+            problems.append(f'время SQL {elapsed:.2f} мс, бюджет {self.ms} мс')
+        if problems:
+            label = f'{self.label}: ' if self.label else ''
+            raise QueryBudgetExceeded(
+                f'{label}{"; ".join(problems)}\n{recorder.report()}')
+
+
+def explain(sql, params, using='default'):
+    """План выполнения запроса SQLite (EXPLAIN QUERY PLAN)."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
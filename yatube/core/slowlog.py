@@ -0,0 +1,144 @@
+"""Журнал медленных SQL-запросов.
+
+Запрос дольше ``SLOW_QUERY_THRESHOLD_MS`` пишется в лог ``core.slowlog``
+одной JSON-строкой: текст с плейсхолдерами, типы параметров вместо
+значений, view и строка шаблона, откуда он пришёл, и план SQLite
+(EXPLAIN QUERY PLAN). Настройка LOGGING направляет лог в файл
+``SLOW_QUERY_LOG``, куда дописывают все воркеры; ротирует его внешний
+logrotate (файлы ``.1``, ``.2`` …). Страница админки группирует записи
+из файла и его копий по отпечатку — форме запроса без литералов.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .queries import explain, normalize, template_origin
+
+logger = logging.getLogger('core.slowlog')
+
+_local = threading.local()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def redact(value):
+    """Тип значения вместо него самого, у строк и байтов — ещё длина.
+
+    Скрываются и числа: id пользователей и постов тоже личные данные.
+    Остаются только None и списки, чтобы была видна форма IN (...).
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+def set_request(request):
+    _local.request = request
+
+
+def request_context():
+    request = getattr(_local, 'request', None)
+    if request is None:
+        return None, None
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else None, request.path
+
+
+def entry(sql, params, duration, alias, origin, many):
+    view, path = request_context()
+    # План выполнения запроса вызывает сам этот хук: не зацикливаемся.
+    _local.explaining = True
+    try:
+        plan = [] if many else explain(sql, params, using=alias)
+    except Exception as exc:
+        plan = [f'EXPLAIN не удался: {exc}']
+    finally:
+        _local.explaining = False
+    return {
+        'time': timezone.now().isoformat(),
+        'duration_ms': round(duration * 1000, 3),
+        'fingerprint': fingerprint(sql),
+        'sql': sql,
+        'params': None if many else redact(params),
+        'alias': alias,
+        'view': view,
+        'path': path,
+        'template': origin,
+        'plan': plan,
+    }
+
+
+def record_slow(execute, sql, params, many, context):
+    """Обёртка курсора: пишет в журнал запросы дольше порога."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None or getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration * 1000 >= threshold:
+        logger.warning(json.dumps(entry(
+            sql, params, duration, context['connection'].alias,
+            template_origin(), many,
+        ), ensure_ascii=False, default=str))
+    return result
+
+
+def install_hook(sender, connection, **kwargs):
+    if record_slow not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow)
+
+
+def log_files():
+    """Файл журнала и его ротированные копии, от старых к новым."""
+    path = settings.SLOW_QUERY_LOG
+    files = [f'{path}.{number}' for number in
+             range(settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)] + [path]
+    return [name for name in files if os.path.exists(name)]
+
+
+def read_entries():
+    for name in log_files():
+        with open(name, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def grouped(entries):
+    """Группы записей по отпечатку, самые затратные в сумме — первыми."""
+    groups = defaultdict(list)
+    for found in entries:
+        groups[found['fingerprint']].append(found)
+    result = []
+    for key, items in groups.items():
+        durations = [item['duration_ms'] for item in items]
+        last = items[-1]
+        result.append({
+            'fingerprint': key,
+            'count': len(items),
+            'total_ms': round(sum(durations), 3),
+            'max_ms': max(durations),
+            'avg_ms': round(sum(durations) / len(durations), 3),
+            'last_seen': last['time'],
+            'shape': normalize(last['sql']),
+            'sample': last,
+            'views': sorted({item['view'] or '-' for item in items}),
+            'templates': sorted({item['template'] or '-' for item in items}),
+        })
+    return sorted(result, key=lambda group: -group['total_ms'])
@@ -0,0 +1,41 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    """sha256 содержимого файла.
+
+    Файлы, прошедшие через хэширующие обработчики загрузки, уже несут
+    готовый хэш; остальные дочитываются по частям.
+    """
+    digest = getattr(content, 'content_hash', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под хэшем содержимого.
+
+    Одинаковые файлы получают одно имя и сохраняются один раз: повторная
+    загрузка возвращает уже лежащий на диске файл.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,63 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import TemplateSyntaxError, VariableDoesNotExist
+from django.templatetags.cache import CacheNode, do_cache
+
+from core.cache import get_or_compute
+
+register = template.Library()
+
+
+class SingleFlightCacheNode(CacheNode):
+    """Фрагмент, который после истечения перерисовывает один запрос.
+
+    Разбор тега тот же, что у встроенного ``{% cache %}``; отличается
+    только чтение: через ``core.cache.get_or_compute``.
+    """
+
+    def resolve(self, var, context):
+        try:
+            return var.resolve(context)
+        except VariableDoesNotExist:
+            raise TemplateSyntaxError(
+                f'"cache" tag got an unknown variable: {var.var!r}')
+
+    def get_cache(self, context):
+        if self.cache_name:
+            name = self.resolve(self.cache_name, context)
+            try:
+                return caches[name]
+            except InvalidCacheBackendError:
+                raise TemplateSyntaxError(
+                    f'Invalid cache name specified for cache tag: {name!r}')
+        try:
+            return caches['template_fragments']
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def render(self, context):
+        expire_time = self.resolve(self.expire_time_var, context)
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise TemplateSyntaxError(
+                    '"cache" tag got a non-integer timeout value: '
+                    f'{expire_time!r}')
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_compute(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            cache=self.get_cache(context),
+        )
+
+
+@register.tag('cache')
+def do_single_flight_cache(parser, token):
+    """``{% cache %}`` с защитой от одновременной перерисовки."""
+    node = do_cache(parser, token)
+    return SingleFlightCacheNode(
+        node.nodelist, node.expire_time_var, node.fragment_name,
+        node.vary_on, node.cache_name)
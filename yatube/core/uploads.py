@@ -0,0 +1,39 @@
+import hashlib
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler, TemporaryFileUploadHandler)
+
+
+class HashingMixin:
+    """Считает sha256 загружаемого файла по мере поступления данных.
+
+    Готовый хэш лежит в ``content_hash`` загруженного файла, так что
+    хранилищу не нужно перечитывать его ещё раз.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Обработчик в памяти прерывает new_file через StopFutureHandlers,
+        # поэтому хэш создаётся заранее.
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        data = super().receive_data_chunk(raw_data, start)
+        if data is None:
+            self.hasher.update(raw_data)
+        return data
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin,
+                                        TemporaryFileUploadHandler):
+    pass
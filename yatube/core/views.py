@@ -1,4 +1,12 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_safe
+
+from . import metrics as collected
+from . import slowlog
 
 
 def page_not_found(request, exception):
@@ -17,3 +25,23 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@require_safe
+def metrics(request):
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(collected.render(collected.collect()),
+                        content_type=collected.CONTENT_TYPE)
+
+
+def slow_queries(request):
+    """Медленные запросы из журнала, сгруппированные по отпечатку."""
+    groups = slowlog.grouped(slowlog.read_entries())
+    return render(request, 'core/slow_queries.html', {
+        **admin.site.each_context(request),
+        'title': 'Медленные SQL-запросы',
+        'groups': groups,
+        'threshold': settings.SLOW_QUERY_THRESHOLD_MS,
+    })
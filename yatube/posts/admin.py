@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Group, Post, Comment, Follow
 
 
@@ -16,6 +17,21 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE по всей таблице.
+        if not search_term or not search.available():
+            return super().get_search_results(
+                request, queryset, search_term)
+        match = search.match_expression(search_term)
+        if not match:
+            return queryset.none(), False
+        # RawSQL в pk__in SQLite оборачивает в лишние скобки и читает
+        # как скалярный подзапрос, поэтому условие задаётся напрямую.
+        return queryset.extra(
+            where=[f'{Post._meta.db_table}.id IN ({search.MATCH_IDS})'],
+            params=[match],
+        ), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,157 @@
+"""JSON-версии лент и страницы поста для приложений и интеграций.
+
+Строки читаются через ``values()`` без создания моделей и шаблонов.
+Набор полей задаётся параметром ``?fields=id,text,author``; листание —
+курсором из ответа (``?cursor=...``), как в HTML-лентах.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from core.pagecache import cache_anonymous
+
+from .conditional import (
+    feed_etag, feed_versions, post_detail_etag, post_versions, profile_etag,
+    profile_versions, success_condition)
+from .models import Group, Post
+from .paginators import CursorPaginator, InvalidCursor
+from .timeline import feed
+
+User = get_user_model()
+
+# Поле ответа и выражение для values().
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+ORDERING = ('-pub_date', '-id')
+FOLLOW_ORDERING = ('-feed_date', '-feed_post')
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error(message, status):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def auth_required(view):
+    """401 до проверки ETag: анониму не отвечают 304 на чужую ленту."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Нужна авторизация.', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def requested_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return list(FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise BadRequest(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(FIELDS)}.')
+    return fields
+
+
+def serialize(rows, fields):
+    storage = Post.image.field.storage
+    results = []
+    for row in rows:
+        item = {name: row[FIELDS[name]] for name in fields}
+        if item.get('image'):
+            item['image'] = storage.url(item['image'])
+        elif 'image' in item:
+            item['image'] = None
+        results.append(item)
+    return results
+
+
+def page_response(request, queryset, ordering=ORDERING):
+    """Курсорная страница строк queryset в виде JSON."""
+    try:
+        fields = requested_fields(request)
+        # Поля ключа сортировки нужны курсору, даже если их не просили.
+        keys = [field.lstrip('-') for field in ordering]
+        rows = queryset.values(
+            *{FIELDS[name] for name in fields}.union(keys))
+        paginator = CursorPaginator(rows, settings.FILL, ordering)
+        page = paginator.page(request.GET.get('cursor'))
+        # Страница читается лениво: ошибки курсора всплывут только здесь.
+        results = serialize(page, fields)
+    except BadRequest as exc:
+        return error(str(exc), 400)
+    except InvalidCursor:
+        return error('Неверный курсор.', 400)
+    return JsonResponse({
+        'results': results,
+        'next': paginator.next_cursor,
+        'previous': paginator.previous_cursor,
+    })
+
+
+@cache_anonymous(feed_versions)
+@require_safe
+@success_condition(feed_etag)
+def index(request):
+    return page_response(request, Post.objects.all())
+
+
+@cache_anonymous(feed_versions)
+@require_safe
+@success_condition(feed_etag)
+def group_posts(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug).values_list('pk', flat=True).first()
+    if group_id is None:
+        return error('Группа не найдена.', 404)
+    return page_response(request, Post.objects.filter(group_id=group_id))
+
+
+@cache_anonymous(profile_versions)
+@require_safe
+@success_condition(profile_etag)
+def profile(request, username):
+    author_id = User.objects.filter(
+        username=username).values_list('pk', flat=True).first()
+    if author_id is None:
+        return error('Автор не найден.', 404)
+    return page_response(request, Post.objects.filter(author_id=author_id))
+
+
+@require_safe
+@auth_required
+@success_condition(profile_etag)
+def follow_index(request):
+    # Лента подписок зависит от подписок читателя, поэтому валидатор
+    # тот же, что у профиля: посты, комментарии и подписки.
+    return page_response(request, feed(request.user), FOLLOW_ORDERING)
+
+
+@cache_anonymous(post_versions)
+@require_safe
+@success_condition(post_detail_etag)
+def post_detail(request, post_id):
+    try:
+        fields = requested_fields(request)
+    except BadRequest as exc:
+        return error(str(exc), 400)
+    rows = Post.objects.filter(pk=post_id).values(
+        *{FIELDS[name] for name in fields})
+    found = serialize(rows[:1], fields)
+    if not found:
+        return error('Пост не найден.', 404)
+    return JsonResponse(found[0])
@@ -0,0 +1,59 @@
+"""Версии содержимого для ключей кэша.
+
+Версия — случайная метка в кэше, которую сигналы моделей заменяют при
+каждом изменении данных. Метка входит в ключи закэшированных страниц,
+поэтому записи могут жить часами, а устаревают в момент изменения:
+после смены версии старые ключи просто перестают запрашиваться.
+"""
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'posts:version:{}'
+FEED = 'feed'
+COMMENTS = 'comments'
+FOLLOWS = 'follows'
+
+
+def comments_scope(post_id):
+    return f'comments:{post_id}'
+
+
+def get_version(scope):
+    key = VERSION_KEY.format(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope):
+    cache.set(VERSION_KEY.format(scope), uuid4().hex, None)
+
+
+def bump_on_commit(*scopes):
+    """Меняет версии сейчас и ещё раз после фиксации транзакции.
+
+    Пока транзакция не зафиксирована, параллельный читатель может взять
+    уже новую версию, прочитать ещё старые строки и закэшировать их под
+    новым ключом; смена версии после фиксации делает такие записи
+    недостижимыми. Первая смена нужна коду внутри той же транзакции:
+    он сразу перестаёт получать страницы, кэшированные до изменения.
+    """
+    def bump():
+        for scope in scopes:
+            bump_version(scope)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def get_versions(scopes):
+    """Версии нескольких областей за одно обращение к кэшу."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    return [versions.get(key) or get_version(scope)
+            for key, scope in zip(keys, scopes)]
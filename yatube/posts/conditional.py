@@ -0,0 +1,81 @@
+"""Валидаторы для условных GET-запросов к страницам постов.
+
+Валидатор считается до рендеринга: если копия клиента актуальна,
+view отвечает 304 и шаблон не отрисовывается вовсе.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.auth import SESSION_KEY
+from django.db.models import Count, Max
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
+
+from .cache import COMMENTS, FEED, FOLLOWS, comments_scope, get_versions
+from .models import Comment
+
+
+def make_etag(request, parts):
+    # Шапка страницы зависит от пользователя, текст — от языка. Id
+    # пользователя берётся из сессии, чтобы не загружать его из базы.
+    parts = [
+        request.path, *map(str, parts),
+        str(request.session.get(SESSION_KEY, '')), get_language() or '',
+    ]
+    return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def scoped_versions(*scopes):
+    """Версии данных страницы: стоят одно обращение к кэшу."""
+    def versions(*args, **kwargs):
+        return get_versions(scopes)
+    return versions
+
+
+def post_versions(post_id):
+    return get_versions([FEED, comments_scope(post_id)])
+
+
+feed_versions = scoped_versions(FEED, COMMENTS)
+profile_versions = scoped_versions(FEED, COMMENTS, FOLLOWS)
+
+
+def versions_etag(versions):
+    def etag(request, *args, **kwargs):
+        return make_etag(request, versions(*args, **kwargs))
+    return etag
+
+
+def success_condition(etag_func):
+    """Как ``condition``, но ответы с ошибкой уходят без ETag.
+
+    Иначе клиент сохранит ETag ответа 404 или 401 и позже получит
+    по нему 304 вместо страницы.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code >= 400:
+                del response['ETag']
+            return response
+        return wrapper
+    return decorator
+
+
+feed_etag = versions_etag(feed_versions)
+profile_etag = versions_etag(profile_versions)
+
+
+def post_detail_etag(request, post_id):
+    """Версия постов и состояние комментариев одного поста.
+
+    Число и время последнего комментария берутся одним запросом по
+    индексу (post, created, id), не читая саму таблицу комментариев.
+    """
+    comments = Comment.objects.filter(post_id=post_id).aggregate(
+        count=Count('id'), latest=Max('created'))
+    return make_etag(request, [
+        *get_versions([FEED]), comments['count'], comments['latest']])
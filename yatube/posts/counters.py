@@ -0,0 +1,139 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Сигналы из ``posts.signals`` сдвигают счётчики F-выражениями в той же
+транзакции, что и изменение данных, поэтому они не расходятся
+с таблицами. Расхождение, накопленное в обход сигналов (массовая
+загрузка, правка базы руками), исправляет ``manage.py recount``.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+def shift(queryset, **deltas):
+    # Счётчик не уходит ниже нуля: строка, которую уменьшать некуда,
+    # просто не обновляется.
+    queryset = queryset.filter(**{
+        f'{field}__gte': -delta
+        for field, delta in deltas.items() if delta < 0
+    })
+    return queryset.update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def shift_user(user_id, **deltas):
+    updated = shift(UserCounters.objects.filter(user_id=user_id), **deltas)
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        # Строки ещё нет: считаем все значения заново, включая
+        # только что сохранённое изменение. При уменьшении строку не
+        # создаём — пользователь может удаляться в этой же транзакции.
+        save_users([count_users([user_id])[user_id]])
+
+
+def shift_group(group_id, delta):
+    if group_id is not None:
+        shift(Group.objects.filter(pk=group_id), posts_count=delta)
+
+
+def shift_post(post_id, delta):
+    shift(Post.objects.filter(pk=post_id), comment_count=delta)
+
+
+def counters_for(user):
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        user.counters = count_users([user.pk])[user.pk]
+        save_users([user.counters])
+        return user.counters
+
+
+def _grouped(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids}).order_by()
+        .values_list(field).annotate(total=Count('pk'))
+    )
+
+
+def count_users(ids):
+    """Точные значения счётчиков для пачки пользователей."""
+    posts = _grouped(Post.objects, 'author_id', ids)
+    followers = _grouped(Follow.objects, 'author_id', ids)
+    following = _grouped(Follow.objects, 'user_id', ids)
+    return {
+        user_id: UserCounters(
+            user_id=user_id,
+            posts_count=posts.get(user_id, 0),
+            followers_count=followers.get(user_id, 0),
+            following_count=following.get(user_id, 0),
+        )
+        for user_id in ids
+    }
+
+
+def count_groups(ids):
+    posts = _grouped(Post.objects, 'group_id', ids)
+    return [
+        Group(pk=group_id, posts_count=posts.get(group_id, 0))
+        for group_id in ids
+    ]
+
+
+def count_posts(ids):
+    comments = _grouped(Comment.objects, 'post_id', ids)
+    return [
+        Post(pk=post_id, comment_count=comments.get(post_id, 0))
+        for post_id in ids
+    ]
+
+
+def save_users(counters):
+    counters = list(counters)
+    existing = set(UserCounters.objects.filter(
+        user_id__in=[item.user_id for item in counters]
+    ).values_list('user_id', flat=True))
+    UserCounters.objects.bulk_update(
+        [item for item in counters if item.user_id in existing],
+        ['posts_count', 'followers_count', 'following_count'],
+    )
+    UserCounters.objects.bulk_create(
+        [item for item in counters if item.user_id not in existing],
+        ignore_conflicts=True,
+    )
+
+
+def _counted(model, field, outer='pk'):
+    """Подзапрос: число строк model, ссылающихся на строку снаружи."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+# Исправление счётчиков для recount. Значения считаются в самом UPDATE,
+# а не переносятся из подсчёта, сделанного раньше: сдвиг, случившийся
+# между подсчётом и записью, иначе был бы затёрт.
+
+def recount_users(counters):
+    ids = [item.user_id for item in counters]
+    UserCounters.objects.bulk_create(counters, ignore_conflicts=True)
+    UserCounters.objects.filter(user_id__in=ids).update(
+        posts_count=_counted(Post, 'author_id', 'user_id'),
+        followers_count=_counted(Follow, 'author_id', 'user_id'),
+        following_count=_counted(Follow, 'user_id', 'user_id'),
+    )
+
+
+def recount_groups(groups):
+    Group.objects.filter(pk__in=[group.pk for group in groups]).update(
+        posts_count=_counted(Post, 'group_id'))
+
+
+def recount_posts(posts):
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        comment_count=_counted(Comment, 'post_id'))
@@ -0,0 +1,99 @@
+"""Кэшируемые счётчики постов для пагинатора и страниц авторов.
+
+Точные значения хранятся в кэше и поддерживаются сигналами
+``posts.signals``: создание поста увеличивает, удаление уменьшает
+счётчики ленты, группы и автора без повторного ``COUNT(*)``.
+``bulk_create`` сигналов не отправляет, так что после массовой
+загрузки счётчики нужно сбросить (``reset``).
+Для очень больших выборок при промахе кэша можно включить
+приблизительный подсчёт (``COUNT_APPROXIMATE``).
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+
+from core.cache import get_or_compute
+
+COUNT_KEY = 'posts:count:{}'
+# Меняется, когда adjust не нашёл счётчика: подсчёт, шедший в это
+# время, мог не увидеть изменение, и его результат сохранять нельзя.
+MISSED_KEY = 'posts:count-missed:{}'
+ALL = 'all'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def scopes_for(post):
+    scopes = [ALL, author_scope(post.author_id)]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def approximate_count(queryset, threshold):
+    """Оценка размера выборки, читающая не больше threshold строк.
+
+    До порога считается точно. Дальше плотность выборки по первичному
+    ключу, измеренная на последних threshold строках, переносится на
+    весь диапазон ключей: границы диапазона берутся из индекса.
+    """
+    queryset = queryset.order_by()
+    keys = queryset.order_by('-pk').values_list('pk', flat=True)
+    boundary = list(keys[threshold - 1:threshold])
+    if not boundary:
+        return queryset.count()
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    sampled = bounds['high'] - boundary[0] + 1
+    return int(threshold * (bounds['high'] - bounds['low'] + 1) / sampled)
+
+
+def cached_count(scope, queryset):
+    key = COUNT_KEY.format(scope)
+    missed_key = MISSED_KEY.format(scope)
+    started = []
+
+    def count():
+        started.append(cache.get(missed_key))
+        if settings.COUNT_APPROXIMATE:
+            return approximate_count(
+                queryset, settings.COUNT_APPROXIMATE_THRESHOLD)
+        return queryset.count()
+
+    # Значение хранится числом, чтобы adjust мог сдвигать его incr.
+    value = get_or_compute(key, count, settings.COUNT_CACHE_TIMEOUT,
+                           cache=cache, raw=True)
+    if started and cache.get(missed_key) != started[0]:
+        # Пока считали, пост добавили или удалили, а сдвигать было
+        # нечего: сохранённое число может отстать, его пересчитают.
+        cache.delete(key)
+    return value
+
+
+def reset(scopes):
+    cache.delete_many([COUNT_KEY.format(scope) for scope in scopes])
+
+
+def adjust(scopes, delta):
+    """Сдвигает закэшированные счётчики; отсутствующие не создаются.
+
+    Сдвиг откладывается до фиксации транзакции: после отката кэш
+    иначе сутки показывал бы число с несостоявшимся изменением.
+    """
+    def shift():
+        for scope in scopes:
+            try:
+                cache.incr(COUNT_KEY.format(scope), delta)
+            except ValueError:
+                cache.set(MISSED_KEY.format(scope), uuid4().hex,
+                          settings.COUNT_CACHE_TIMEOUT)
+
+    transaction.on_commit(shift)
@@ -0,0 +1,48 @@
+import logging
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post, StoredImage
+
+logger = logging.getLogger(__name__)
+
+
+def retain(name, count=1):
+    """Учитывает ещё count постов, ссылающихся на файл."""
+    images = StoredImage.objects.filter(name=name)
+    if images.update(references=F('references') + count):
+        return
+    try:
+        with transaction.atomic():
+            StoredImage.objects.create(name=name, references=count)
+    except IntegrityError:
+        images.update(references=F('references') + count)
+
+
+def release(name):
+    """Снимает ссылку и удаляет файл, когда на него не ссылается никто.
+
+    Файл с миниатюрами удаляется только после фиксации транзакции:
+    откат не должен оставить пост без картинки.
+    """
+    images = StoredImage.objects.filter(name=name)
+    images.filter(references__gt=0).update(references=F('references') - 1)
+    deleted, _ = images.filter(references=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_file(name))
+
+
+def delete_file(name):
+    # Пока ждали фиксации, тот же файл мог быть загружен заново.
+    if StoredImage.objects.filter(name=name).exists():
+        return
+    try:
+        delete_with_thumbnails(ImageFile(name, Post.image.field.storage))
+    except (OSError, SuspiciousFileOperation):
+        # Пост уже удалён, поэтому недоступный файл только записывается
+        # в журнал, а не ломает запрос.
+        logger.exception('Не удалось удалить картинку %s', name)
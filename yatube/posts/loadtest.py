@@ -0,0 +1,224 @@
+"""Нагрузка на WSGI-приложение прямо из процесса, без HTTP-сервера.
+
+Запросы к страницам ``posts.urls`` собираются заранее: адреса выбираются
+из базы с тем же перекосом, что и у живого трафика (популярные авторы,
+свежие посты), а часть запросов идёт от вошедших пользователей с
+настоящей сессией. Затем план исполняется потоками или процессами,
+и по каждому имени адреса считаются пропускная способность и задержка.
+"""
+import math
+import multiprocessing
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model)
+from django.db import connections
+from django.urls import reverse
+
+from .models import Group, Post
+from .seed import Zipf
+
+User = get_user_model()
+
+# Доля запросов к каждой странице; ленту подписок видят только вошедшие.
+MIX = {
+    'posts:index': 30,
+    'posts:post_detail': 25,
+    'posts:profile': 15,
+    'posts:group_list': 10,
+    'posts:follow_index': 10,
+    'posts:post_comments': 5,
+    'posts:search': 5,
+}
+LOGIN_ONLY = {'posts:follow_index'}
+PERCENTILES = (50, 95, 99)
+SAMPLE = 1000
+
+
+class Request:
+    __slots__ = ('name', 'path', 'query', 'cookie')
+
+    def __init__(self, name, path, query='', cookie=''):
+        self.name = name
+        self.path = path
+        self.query = query
+        self.cookie = cookie
+
+    def environ(self):
+        environ = {
+            'PATH_INFO': self.path,
+            'QUERY_STRING': self.query,
+            'wsgi.input': BytesIO(),
+        }
+        if self.cookie:
+            environ['HTTP_COOKIE'] = self.cookie
+        setup_testing_defaults(environ)
+        return environ
+
+
+def login_cookie(user):
+    """Cookie с сессией пользователя, как после входа на сайт."""
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = str(user.pk)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.save()
+    return f'{settings.SESSION_COOKIE_NAME}={store.session_key}'
+
+
+class Planner:
+    def __init__(self, seed=0, alpha=1.1, logged_in=0.2, sessions=20):
+        self.rng = random.Random(seed)
+        self.alpha = alpha
+        self.logged_in = logged_in
+        authors = list(User.objects.order_by(
+            '-counters__posts_count', 'pk'
+        ).values_list('username', flat=True)[:SAMPLE])
+        posts = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('pk', 'text')[:SAMPLE])
+        groups = list(Group.objects.order_by(
+            '-posts_count', 'pk').values_list('slug', flat=True)[:SAMPLE])
+        if not authors or not posts:
+            raise ValueError('В базе нет постов: сначала seed_dataset.')
+        self.authors = Zipf(authors, alpha, self.rng)
+        self.posts = Zipf([pk for pk, _ in posts], alpha, self.rng)
+        self.groups = Zipf(groups, alpha, self.rng) if groups else None
+        self.words = [
+            word for _, text in posts[:50] for word in text.split()
+            if len(word) > 4 and word.isalpha()
+        ] or ['пост']
+        # Читатели ленты подписок — те, у кого подписки есть.
+        readers = list(User.objects.filter(
+            counters__following_count__gt=0).order_by('pk')[:SAMPLE])
+        self.cookies = [
+            login_cookie(user) for user in
+            self.rng.sample(readers, min(sessions, len(readers)))
+        ]
+
+    def request(self, name):
+        query = ''
+        if name == 'posts:index':
+            path = reverse(name)
+        elif name in ('posts:post_detail', 'posts:post_comments'):
+            path = reverse(name, args=[self.posts.pick()[0]])
+        elif name == 'posts:profile':
+            path = reverse(name, args=[self.authors.pick()[0]])
+        elif name == 'posts:group_list':
+            path = reverse(name, args=[self.groups.pick()[0]])
+        elif name == 'posts:search':
+            path = reverse(name)
+            query = urlencode({'q': self.rng.choice(self.words)})
+        else:
+            path = reverse(name)
+        cookie = ''
+        if self.cookies and (name in LOGIN_ONLY
+                             or self.rng.random() < self.logged_in):
+            cookie = self.rng.choice(self.cookies)
+        return Request(name, path, query, cookie)
+
+    def plan(self, total, mix=None):
+        mix = dict(mix or MIX)
+        if not self.cookies:
+            for name in LOGIN_ONLY:
+                mix.pop(name, None)
+        if not self.groups:
+            mix.pop('posts:group_list', None)
+        names = self.rng.choices(list(mix), weights=list(mix.values()),
+                                 k=total)
+        return [self.request(name) for name in names]
+
+
+def call(application, request):
+    """Выполняет запрос; возвращает (имя, статус, секунды)."""
+    status = []
+
+    def start_response(line, headers, exc_info=None):
+        status.append(int(line.split()[0]))
+
+    started = time.perf_counter()
+    try:
+        response = application(request.environ(), start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+    except Exception:
+        status.append(500)
+    return request.name, status[-1], time.perf_counter() - started
+
+
+def _serve(requests):
+    from yatube.wsgi import application
+
+    try:
+        return [call(application, request) for request in requests]
+    finally:
+        connections.close_all()
+
+
+def _split(requests, parts):
+    return [requests[number::parts] for number in range(parts)]
+
+
+def run(requests, concurrency=1, mode='threads'):
+    """Исполняет план; возвращает результаты и общее время в секундах.
+
+    При concurrency=1 запросы идут в текущем потоке и его соединении
+    с базой — так нагрузку можно запускать и внутри тестов.
+    """
+    started = time.perf_counter()
+    if concurrency == 1:
+        from yatube.wsgi import application
+
+        results = [call(application, request) for request in requests]
+        return results, time.perf_counter() - started
+    chunks = _split(requests, concurrency)
+    if mode == 'processes':
+        # Соединения с базой нельзя делить с дочерними процессами.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(concurrency) as pool:
+            parts = pool.map(_serve, chunks)
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            parts = list(pool.map(_serve, chunks))
+    results = [result for part in parts for result in part]
+    return results, time.perf_counter() - started
+
+
+def percentile(timings, percent):
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    rank = max(math.ceil(percent / 100 * len(timings)), 1)
+    return timings[rank - 1]
+
+
+def summarize(results, elapsed):
+    """Сводка по именам адресов: число, ошибки, запросов/с, перцентили."""
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    for name, status, seconds in results:
+        timings[name].append(seconds)
+        if status >= 400:
+            errors[name] += 1
+    rows = []
+    for name in sorted(timings, key=lambda name: -len(timings[name])):
+        ordered = sorted(timings[name])
+        rows.append({
+            'name': name,
+            'count': len(ordered),
+            'errors': errors[name],
+            'rps': len(ordered) / elapsed if elapsed else 0.0,
+            **{f'p{percent}': percentile(ordered, percent) * 1000
+               for percent in PERCENTILES},
+        })
+    return rows
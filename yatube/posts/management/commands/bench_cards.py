@@ -0,0 +1,94 @@
+import json
+import time
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.utils import timezone
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+# Разметка карточки до тега post_card: подключаемые шаблоны и {% url %}.
+INCLUDE_CARDS = Template(
+    "{% for post in posts %}"
+    "{% include 'includes/author_&_date_pub.html' %}"
+    "{% include 'includes/post_image.html' with geometry='feed' %}"
+    "<p>{{ post.text }}</p>"
+    "<a href=\"{% url 'posts:post_detail' post.id %}\">подробнее</a>"
+    "{% if post.group %}"
+    "<a href=\"{% url 'posts:group_list' post.group.slug %}\">группа</a>"
+    "{% endif %}"
+    "{% endfor %}"
+)
+TAG_CARDS = Template(
+    "{% load post_cards %}"
+    "{% for post in posts %}{% post_card post 'feed' %}{% endfor %}"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время отрисовки карточек постов на 10, 100 и 1000 '
+        'карточках. Посты создаются в памяти, база не нужна.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cards', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--history',
+            help='Файл, в конец которого дописываются результаты (JSON '
+                 'по строке на запуск), чтобы следить за ними со временем.',
+        )
+
+    def handle(self, *args, **options):
+        posts = self.make_posts(max(options['cards']))
+        results = []
+        self.stdout.write(
+            f'{"шаблон":<10}{"карточек":>10}{"мс":>12}{"мкс/карт.":>12}')
+        for name, template in (('include', INCLUDE_CARDS),
+                               ('post_card', TAG_CARDS)):
+            for cards in options['cards']:
+                elapsed = self.measure(
+                    template, posts[:cards], options['repeat'])
+                per_card = elapsed / cards * 1000
+                results.append({'template': name, 'cards': cards,
+                                'ms': round(elapsed, 3),
+                                'us_per_card': round(per_card, 2)})
+                self.stdout.write(
+                    f'{name:<10}{cards:>10}{elapsed:>12.3f}{per_card:>12.2f}')
+        if options['history']:
+            with open(options['history'], 'a') as history:
+                history.write(json.dumps({
+                    'date': datetime.now().isoformat(timespec='seconds'),
+                    'results': results,
+                }) + '\n')
+
+    def make_posts(self, total):
+        group = Group(pk=1, title='Группа', slug='group')
+        authors = [
+            User(pk=number, username=f'author{number}',
+                 first_name='Имя', last_name=f'Фамилия {number}')
+            for number in range(1, 11)
+        ]
+        now = timezone.now()
+        return [
+            Post(pk=number, text=f'Пост {number} ' * 20, pub_date=now,
+                 author=authors[number % len(authors)],
+                 group=group if number % 2 else None,
+                 comment_count=number % 7)
+            for number in range(1, total + 1)
+        ]
+
+    def measure(self, template, posts, repeat):
+        context = Context({'posts': posts})
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            template.render(context)
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
@@ -0,0 +1,86 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+
+from posts.models import Post
+from posts.paginators import CursorPaginator
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку OFFSET- и курсорной пагинации ленты '
+        'на первой и глубокой странице. Работает на временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--page', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.fill(options['posts'], options['batch'])
+            self.report(options['page'], options['repeat'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def fill(self, total, batch):
+        author = User.objects.create_user(username='bench_author')
+        started = time.perf_counter()
+        for offset in range(0, total, batch):
+            Post.objects.bulk_create(
+                Post(author=author, text=f'Пост {number}')
+                for number in range(offset, min(offset + batch, total))
+            )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(
+            f'Создано постов: {total} '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+
+    def measure(self, fetch, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fetch()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    def report(self, deep_page, repeat):
+        queryset = Post.objects.all()
+        offset = Paginator(queryset, settings.FILL)
+        cursor = CursorPaginator(queryset, settings.FILL)
+        deep_page = min(deep_page, offset.num_pages)
+        # Курсор глубокой страницы — последний пост предыдущей страницы.
+        anchor = cursor.object_list[
+            (deep_page - 1) * settings.FILL - 1] if deep_page > 1 else None
+        deep_cursor = cursor.cursor_for(anchor) if anchor else None
+
+        def offset_page(number):
+            return lambda: list(Paginator(queryset, settings.FILL)
+                                .page(number))
+
+        def cursor_page(token):
+            return lambda: list(CursorPaginator(queryset, settings.FILL)
+                                .page(token))
+
+        rows = (
+            ('offset', 1, offset_page(1)),
+            ('offset', deep_page, offset_page(deep_page)),
+            ('cursor', 1, cursor_page(None)),
+            ('cursor', deep_page, cursor_page(deep_cursor)),
+        )
+        self.stdout.write(f'{"режим":<8}{"страница":>10}{"мс":>12}')
+        for mode, number, fetch in rows:
+            elapsed = self.measure(fetch, repeat)
+            self.stdout.write(f'{mode:<8}{number:>10}{elapsed:>12.3f}')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в NDJSON или CSV. '
+        'Таблица читается пачками, память не растёт с её размером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', choices=list(transfer.COLUMNS), default=transfer.POSTS)
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='ndjson')
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки; «-» — стандартный вывод.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = transfer.export_rows(options['kind'], options['chunk_size'])
+        if options['output'] == '-':
+            written = transfer.write(
+                rows, self.stdout, options['kind'], options['format'])
+        else:
+            with open(options['output'], 'w', newline='',
+                      encoding='utf-8') as stream:
+                written = transfer.write(
+                    rows, stream, options['kind'], options['format'])
+        self.stderr.write(f'Выгружено строк: {written}')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.cache import FEED, bump_version
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры для картинок всех постов.'
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').order_by('image').values_list(
+            'image', flat=True).distinct()
+        done = 0
+        for image_name in images.iterator():
+            thumbnails.generate(image_name)
+            done += 1
+        if done:
+            # Страницы, закэшированные с оригиналами картинок.
+            bump_version(FEED)
+        self.stdout.write(f'Обработано картинок: {done}')
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из NDJSON или CSV '
+        'пачками bulk_create. Миниатюры потом создаёт generate_thumbnails.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл для загрузки; «-» — стандартный ввод.')
+        parser.add_argument(
+            '--kind', choices=list(transfer.COLUMNS), default=transfer.POSTS)
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='По умолчанию определяется по расширению файла.')
+        parser.add_argument('--batch', type=int, default=1000)
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы, а не пропускать '
+                 'их строки.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson')
+        importer = transfer.Importer(
+            options['batch'], options['create_missing'])
+        try:
+            if path == '-':
+                created, skipped = importer.run(
+                    options['kind'], transfer.read(sys.stdin, file_format))
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    created, skipped = importer.run(
+                        options['kind'], transfer.read(stream, file_format))
+        except transfer.ImportConflict as exc:
+            raise CommandError(
+                f'{exc} Загружено до ошибки: {importer.created}.')
+        self.stdout.write(
+            f'Загружено: {created}, пропущено: {skipped} '
+            f'(уже были в базе: {importer.existing})')
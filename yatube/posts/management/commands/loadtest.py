@@ -0,0 +1,58 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает WSGI-приложение из потоков или процессов и печатает '
+        'запросы в секунду и задержку p50/p95/p99 по адресам posts.urls.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--mode', choices=('threads', 'processes'), default='threads')
+        parser.add_argument(
+            '--logged-in', type=float, default=0.2,
+            help='Доля запросов от вошедших пользователей.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--history',
+            help='Файл, в конец которого дописываются результаты (JSON '
+                 'по строке на запуск).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            planner = loadtest.Planner(
+                options['seed'], logged_in=options['logged_in'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        requests = planner.plan(options['requests'])
+        results, elapsed = loadtest.run(
+            requests, options['concurrency'], options['mode'])
+        rows = loadtest.summarize(results, elapsed)
+        self.stdout.write(
+            f'{"адрес":<22}{"запросов":>9}{"ошибок":>8}{"в сек.":>9}'
+            f'{"p50 мс":>9}{"p95 мс":>9}{"p99 мс":>9}')
+        for row in rows:
+            self.stdout.write(
+                f'{row["name"]:<22}{row["count"]:>9}{row["errors"]:>8}'
+                f'{row["rps"]:>9.1f}{row["p50"]:>9.2f}{row["p95"]:>9.2f}'
+                f'{row["p99"]:>9.2f}')
+        self.stdout.write(
+            f'Всего: {len(results)} за {elapsed:.2f} с, '
+            f'{len(results) / elapsed:.1f} запросов в секунду')
+        if options['history']:
+            with open(options['history'], 'a') as history:
+                history.write(json.dumps({
+                    'date': datetime.now().isoformat(timespec='seconds'),
+                    'mode': options['mode'],
+                    'concurrency': options['concurrency'],
+                    'results': rows,
+                }) + '\n')
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from posts import counters
+from posts.models import Group, Post, UserCounters
+
+User = get_user_model()
+
+
+def chunks(queryset, size):
+    batch = []
+    for pk in queryset.values_list('pk', flat=True).iterator(chunk_size=size):
+        batch.append(pk)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def drifted_users(ids):
+    actual = counters.count_users(ids)
+    stored = UserCounters.objects.in_bulk(ids)
+    fields = ('posts_count', 'followers_count', 'following_count')
+    return [
+        item for user_id, item in actual.items()
+        if user_id not in stored or any(
+            getattr(stored[user_id], field) != getattr(item, field)
+            for field in fields
+        )
+    ]
+
+
+def drifted_groups(ids):
+    stored = dict(Group.objects.filter(
+        pk__in=ids).values_list('pk', 'posts_count'))
+    return [
+        group for group in counters.count_groups(ids)
+        if stored.get(group.pk) != group.posts_count
+    ]
+
+
+def drifted_posts(ids):
+    stored = dict(Post.objects.filter(
+        pk__in=ids).values_list('pk', 'comment_count'))
+    return [
+        post for post in counters.count_posts(ids)
+        if stored.get(post.pk) != post.comment_count
+    ]
+
+
+def in_own_connection(function):
+    def wrapper(ids):
+        try:
+            return function(ids)
+        finally:
+            connection.close()
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики и исправляет '
+        'расхождения. Пачки проверяются параллельно; разошедшиеся '
+        'счётчики пересчитываются по очереди, каждая пачка одним UPDATE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        jobs = (
+            ('пользователей', User.objects.order_by('pk'), drifted_users,
+             counters.recount_users),
+            ('групп', Group.objects.order_by('pk'), drifted_groups,
+             counters.recount_groups),
+            ('постов', Post.objects.order_by('pk'), drifted_posts,
+             counters.recount_posts),
+        )
+        for title, queryset, compute, save in jobs:
+            repaired = 0
+            for rows in self.run(compute, chunks(queryset, options['batch']),
+                                 options['workers']):
+                if rows:
+                    with transaction.atomic():
+                        save(rows)
+                    repaired += len(rows)
+            self.stdout.write(f'Исправлено счётчиков {title}: {repaired}')
+
+    def run(self, compute, batches, workers):
+        if workers <= 1:
+            yield from map(compute, batches)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(in_own_connection(compute), batches)
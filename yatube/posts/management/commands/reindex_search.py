@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=1000,
+            help='Сколько постов читать из базы за один запрос.'
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.available(using):
+            raise CommandError(
+                'Полнотекстовый поиск работает только в SQLite.')
+        with transaction.atomic(using=using):
+            total = search.reindex(options['batch'], using)
+        self.stdout.write(f'Проиндексировано постов: {total}')
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seed import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками. Активность авторов и популярность '
+        'постов распределены по степенному закону.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10_000)
+        parser.add_argument('--comments', type=int, default=20_000)
+        parser.add_argument(
+            '--follows', type=float, default=10,
+            help='Среднее число подписок на пользователя.')
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степени: чем больше, тем сильнее перекос.')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределить посты.')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Одинаковый seed даёт одинаковый набор данных.')
+        parser.add_argument('--batch', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        seeder = Seeder(options['seed'], options['alpha'], options['days'],
+                        options['batch'])
+        started = time.perf_counter()
+        created = seeder.run(options['users'], options['groups'],
+                             options['posts'], options['comments'],
+                             options['follows'])
+        self.stdout.write(
+            ', '.join(f'{kind}: {total}' for kind, total in created.items())
+            + f' за {time.perf_counter() - started:.1f} с'
+        )
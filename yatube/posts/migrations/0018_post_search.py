@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    from posts import search
+    if not search.available(schema_editor.connection.alias):
+        return
+    search.install(schema_editor.connection)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {search.TABLE}({search.TABLE}) VALUES ('rebuild')")
+
+
+def drop_index(apps, schema_editor):
+    from posts import search
+    if search.available(schema_editor.connection.alias):
+        search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,20 +1,57 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
 
-class Group (models.Model):
+class KeepCountersMixin:
+    """Полный save() не пишет счётчики из COUNTERS.
+
+    Их сдвигают F-выражениями в ``posts.counters``; значение в
+    загруженном объекте может устареть, и запись его целиком затёрла
+    бы параллельные сдвиги. Явный update_fields сохраняет что указано.
+    """
+    COUNTERS = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTERS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(KeepCountersMixin, models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов', default=0, editable=False)
+
+    COUNTERS = ('posts_count',)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Стандартный план загрузки карточек постов.
+
+        Автор и группа приходят тем же запросом, а число комментариев
+        хранится в самом посте, так что страница ленты отрисовывается
+        за постоянное число запросов.
+        """
+        return self.select_related('author', 'group')
+
+
+class Post(KeepCountersMixin, models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(
         'Дата публикации',
@@ -35,14 +72,29 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True,
     )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев', default=0, editable=False)
+
+    COUNTERS = ('comment_count',)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -68,6 +120,11 @@ class Comment(models.Model):
     class Meta:
         default_related_name = 'comments'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.text
@@ -92,6 +149,89 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=['user', 'author'], name='unique_follow')
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.user.username
+
+
+class UserCounters(models.Model):
+    """Счётчики пользователя, поддерживаемые при записи.
+
+    Обновляются F-выражениями в ``posts.counters``, поэтому страницы
+    профиля и поста читают их без агрегирующих запросов.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='counters'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self) -> str:
+        return str(self.user_id)
+
+
+class StoredImage(models.Model):
+    """Файл картинки и число постов, которые на него ссылаются.
+
+    Одинаковые картинки хранятся одним файлом, поэтому удалять его
+    можно, только когда ссылок не осталось.
+    """
+    name = models.CharField('Файл', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок: пост автора, на которого подписан user.
+
+    Ленты заполняются при публикации (fan-out on write), поэтому
+    чтение ленты — один проход по индексу (user, pub_date).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_feed_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self) -> str:
+        return f'{self.user_id}: {self.post_id}'
@@ -0,0 +1,270 @@
+import base64
+import binascii
+import datetime as dt
+import json
+from collections.abc import Sequence
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .counts import cached_count
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, direction=FORWARD):
+    """Упаковывает значения ключа сортировки в непрозрачную строку."""
+    payload = [
+        value.isoformat() if isinstance(value, dt.datetime) else value
+        for value in values
+    ]
+    raw = json.dumps([direction, payload], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает пару (направление, значения ключа) из курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(raw.decode())
+    except (TypeError, ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if direction not in (FORWARD, BACKWARD) or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return direction, values
+
+
+def fits_integer(value):
+    """Больше 64 бит не примет ни SQLite, ни bigint в PostgreSQL."""
+    return -2 ** 63 <= value < 2 ** 63
+
+
+def key_field(queryset, name):
+    """Поле модели или аннотации, по которому идёт сортировка."""
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    return queryset.model._meta.get_field(name)
+
+
+def convert_position(queryset, ordering, values, cursor):
+    """Приводит значения из курсора к типам полей ключа сортировки.
+
+    Курсор приходит от клиента: значение неподходящего типа должно
+    давать InvalidCursor, а не ошибку базы при построении запроса.
+    """
+    if len(values) != len(ordering):
+        raise InvalidCursor(cursor)
+    converted = []
+    for field, value in zip(ordering, values):
+        if value is None or isinstance(value, (list, dict, bool)):
+            raise InvalidCursor(cursor)
+        try:
+            value = key_field(queryset, field.lstrip('-')).to_python(value)
+        except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if value is None:
+            raise InvalidCursor(cursor)
+        if isinstance(value, int) and not fits_integer(value):
+            raise InvalidCursor(cursor)
+        if isinstance(value, dt.datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.utc)
+        converted.append(value)
+    return converted
+
+
+def keyset_filter(ordering, values, backwards=False):
+    """Условие «строго после позиции values» для заданной сортировки.
+
+    Для ключа (a, b) по убыванию получается
+    ``a <= va AND (a < va OR (a = va AND b < vb))``: первое условие
+    даёт базе границу диапазона по индексу, поэтому чтение начинается
+    сразу с нужного места, без OFFSET.
+    """
+    conditions = []
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != backwards
+        lookup = {
+            prev.lstrip('-'): value
+            for prev, value in zip(ordering[:position], values)
+        }
+        lookup[f'{name}__{"lt" if descending else "gt"}'] = values[position]
+        conditions.append(Q(**lookup))
+    first = ordering[0]
+    bound = 'lte' if first.startswith('-') != backwards else 'gte'
+    return Q(**{f'{first.lstrip("-")}__{bound}': values[0]}) & reduce(
+        or_, conditions)
+
+
+def reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith('-') else f'-{field}'
+        for field in ordering
+    )
+
+
+class CountedPaginator(Paginator):
+    """Paginator, считающий объекты отдельным, более дешёвым запросом."""
+
+    def __init__(self, object_list, per_page, count_queryset=None):
+        self.count_queryset = (
+            object_list if count_queryset is None else count_queryset)
+        super().__init__(object_list, per_page)
+
+    @cached_property
+    def count(self):
+        return self.count_queryset.count()
+
+
+class CachedCountPaginator(CountedPaginator):
+    """Paginator, берущий общее число объектов из счётчиков в кэше."""
+
+    def __init__(self, object_list, per_page, count_scope,
+                 count_queryset=None):
+        self.count_scope = count_scope
+        super().__init__(object_list, per_page, count_queryset)
+
+    @cached_property
+    def count(self):
+        return cached_count(self.count_scope, self.count_queryset)
+
+
+class CursorWindow(Sequence):
+    """Строки одной курсорной страницы, читаемые из базы лениво.
+
+    Запрос выполняется при первом обращении, так что страница, целиком
+    взятая из кэша шаблона, к базе не обращается вовсе.
+    """
+
+    def __init__(self, queryset, ordering, per_page, position, backwards):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+        self.position = position
+        self.backwards = backwards
+
+    @cached_property
+    def _fetched(self):
+        queryset = self.queryset
+        ordering = self.ordering
+        if self.position is not None:
+            queryset = queryset.filter(
+                keyset_filter(ordering, self.position, self.backwards))
+        if self.backwards:
+            ordering = reverse_ordering(ordering)
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if self.backwards:
+            rows.reverse()
+        return rows, has_more
+
+    @property
+    def rows(self):
+        return self._fetched[0]
+
+    @property
+    def has_next(self):
+        if self.backwards:
+            return self.position is not None
+        return self._fetched[1]
+
+    @property
+    def has_previous(self):
+        if self.backwards:
+            return self._fetched[1]
+        return self.position is not None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по курсору (keyset) вместо OFFSET.
+
+    Страница выбирается условием по ключу сортировки ``ordering``
+    (по умолчанию ``(pub_date, id)``), поэтому любая страница ленты
+    стоит одного индексного чтения ``per_page + 1`` строк, а общий
+    ``COUNT(*)`` не нужен вовсе. Возвращается обычный ``Page``;
+    курсоры соседних страниц доступны как ``paginator.next_cursor``
+    и ``paginator.previous_cursor``.
+    """
+    cursor_based = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.ordering = tuple(ordering)
+        self.window = None
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    @property
+    def num_pages(self):
+        # Общее число страниц курсору неизвестно: видно лишь, есть ли
+        # страницы до и после текущей, поэтому номера здесь условные.
+        if self.window is None:
+            return 1
+        number = 2 if self.window.has_previous else 1
+        return number + 1 if self.window.has_next else number
+
+    def get_page(self, cursor):
+        """Страница по курсору; битый курсор открывает первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor):
+        position, backwards = None, False
+        if cursor:
+            direction, values = decode_cursor(cursor)
+            position = convert_position(
+                self.object_list, self.ordering, values, cursor)
+            backwards = direction == BACKWARD
+        self.window = CursorWindow(
+            self.object_list, self.ordering, self.per_page,
+            position, backwards,
+        )
+        number = 2 if self.window.has_previous else 1
+        return self._get_page(self.window, number, self)
+
+    @property
+    def next_cursor(self):
+        if self.window is None or not self.window.has_next:
+            return None
+        if not self.window.rows:
+            return None
+        return self.cursor_for(self.window.rows[-1], FORWARD)
+
+    @property
+    def previous_cursor(self):
+        if self.window is None or not self.window.has_previous:
+            return None
+        if not self.window.rows:
+            return None
+        return self.cursor_for(self.window.rows[0], BACKWARD)
+
+    def cursor_for(self, obj, direction=FORWARD):
+        return encode_cursor(
+            [self._key_value(obj, field) for field in self.ordering],
+            direction,
+        )
+
+    @staticmethod
+    def _key_value(obj, field):
+        name = field.lstrip('-')
+        if isinstance(obj, dict):
+            return obj[name]
+        return getattr(obj, name)
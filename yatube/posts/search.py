@@ -0,0 +1,163 @@
+import math
+import re
+
+from django.db import connection, connections
+
+from .models import Post
+from .paginators import (
+    InvalidCursor, decode_cursor, encode_cursor, fits_integer)
+
+TABLE = 'posts_post_fts'
+
+CREATE_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+# Индекс с внешним содержимым хранит только термы, поэтому при
+# удалении и правке ему нужно передать старый текст поста.
+TRIGGERS = (
+    f'CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON posts_post '
+    f'BEGIN INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON posts_post '
+    f'BEGIN INSERT INTO {TABLE}({TABLE}, rowid, text) '
+    "VALUES ('delete', old.id, old.text); END",
+    f'CREATE TRIGGER IF NOT EXISTS {TABLE}_au '
+    'AFTER UPDATE OF text ON posts_post '
+    f'BEGIN INSERT INTO {TABLE}({TABLE}, rowid, text) '
+    "VALUES ('delete', old.id, old.text); "
+    f'INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END',
+)
+DROP = (
+    f'DROP TRIGGER IF EXISTS {TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {TABLE}_au',
+    f'DROP TABLE IF EXISTS {TABLE}',
+)
+
+MATCH_IDS = f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+# rank в FTS5 — это bm25: чем меньше, тем релевантнее. Пара
+# (rank, rowid) однозначно задаёт позицию для следующей страницы.
+RANKED = (
+    f'SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s'
+    '{after} ORDER BY rank, rowid LIMIT %s'
+)
+AFTER = ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+
+WORD = re.compile(r'\w+')
+
+
+def available(using=None):
+    db = connections[using] if using else connection
+    return db.vendor == 'sqlite'
+
+
+def install(db):
+    """Создаёт индекс и триггеры, если их ещё нет."""
+    with db.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        for sql in TRIGGERS:
+            cursor.execute(sql)
+
+
+def uninstall(db):
+    with db.cursor() as cursor:
+        for sql in DROP:
+            cursor.execute(sql)
+
+
+def restore_triggers(using, **kwargs):
+    """Возвращает триггеры на место после миграций.
+
+    SQLite пересоздаёт таблицу при изменении её схемы, и триггеры
+    старой таблицы пропадают вместе с ней.
+    """
+    db = connections[using]
+    if available(using) and TABLE in db.introspection.table_names():
+        install(db)
+
+
+def match_expression(query):
+    """Переводит ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки и ищется по префиксу, так что
+    операторы и спецсимволы FTS5 из строки поиска не интерпретируются.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def position(cursor):
+    """Пара (rank, rowid) из курсора поиска или InvalidCursor."""
+    _, values = decode_cursor(cursor)
+    if len(values) != 2:
+        raise InvalidCursor(cursor)
+    rank, rowid = values
+    if (isinstance(rank, bool) or not isinstance(rank, (int, float))
+            or not math.isfinite(rank)):
+        raise InvalidCursor(cursor)
+    if (isinstance(rowid, bool) or not isinstance(rowid, int)
+            or not fits_integer(rowid)):
+        raise InvalidCursor(cursor)
+    return float(rank), rowid
+
+
+def search(query, per_page, cursor=None):
+    """Возвращает посты по запросу от релевантных к менее релевантным.
+
+    Поиск идёт по инвертированному индексу, поэтому читаются только
+    совпавшие документы, а не вся таблица постов. Вторым значением
+    возвращается курсор следующей страницы или None; битый курсор
+    открывает первую страницу.
+    """
+    match = match_expression(query)
+    if not match:
+        return [], None
+    if not available():
+        posts = Post.objects.for_feed().filter(text__icontains=query)
+        return list(posts[:per_page]), None
+    after, params = '', [match]
+    if cursor:
+        try:
+            rank, rowid = position(cursor)
+        except InvalidCursor:
+            pass
+        else:
+            params += [rank, rank, rowid]
+            after = AFTER
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(
+            RANKED.format(after=after), params + [per_page + 1])
+        rows = db_cursor.fetchall()
+    found = Post.objects.for_feed().in_bulk([rowid for rowid, _ in rows])
+    page = rows[:per_page]
+    posts = [found[rowid] for rowid, _ in page if rowid in found]
+    next_cursor = None
+    if len(rows) > per_page:
+        rowid, rank = page[-1]
+        next_cursor = encode_cursor([rank, rowid])
+    return posts, next_cursor
+
+
+def reindex(batch_size, using=None):
+    """Перестраивает индекс, читая посты пачками по первичному ключу.
+
+    Возвращает число проиндексированных постов.
+    """
+    db = connections[using] if using else connection
+    insert = f'INSERT INTO {TABLE}(rowid, text) VALUES (%s, %s)'
+    posts = Post.objects.using(db.alias).order_by('pk')
+    last_pk, total = 0, 0
+    with db.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('delete-all')")
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk).values_list(
+                'pk', 'text')[:batch_size])
+            if not batch:
+                break
+            cursor.executemany(insert, batch)
+            last_pk = batch[-1][0]
+            total += len(batch)
+        # Слияние сегментов держит число b-деревьев, а с ним и время
+        # поиска, небольшим после массовой загрузки.
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+    return total
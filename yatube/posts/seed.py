@@ -0,0 +1,127 @@
+"""Синтетические данные с перекосами, как у живого сайта.
+
+Активность подчиняется степенному закону: немногие авторы пишут
+большую часть постов и собирают большую часть подписчиков, немногие
+посты собирают большую часть комментариев. Посты, комментарии и
+подписки загружаются через ``transfer.Importer``, поэтому счётчики,
+ленты подписок и поисковый индекс получаются такими же, как при
+обычной работе сайта.
+"""
+import datetime as dt
+import random
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from . import transfer
+from .models import Group, Post
+
+User = get_user_model()
+
+
+class Zipf:
+    """Выбор элемента с весом 1 / rank ** alpha."""
+
+    def __init__(self, items, alpha, rng):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(accumulate(
+            1 / rank ** alpha for rank in range(1, len(items) + 1)))
+
+    def pick(self, count=1):
+        return self.rng.choices(
+            self.items, cum_weights=self.cum_weights, k=count)
+
+
+class Seeder:
+    def __init__(self, seed=0, alpha=1.1, days=365, batch_size=1000,
+                 locale='ru_RU'):
+        self.rng = random.Random(seed)
+        self.fake = Faker(locale)
+        self.fake.seed_instance(seed)
+        self.alpha = alpha
+        self.days = days
+        self.batch_size = batch_size
+        self.prefix = f's{seed}'
+
+    def users(self, total):
+        password = make_password(None)
+        names = [f'{self.prefix}_user{number}' for number in range(total)]
+        for start in range(0, total, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(username=name, password=password,
+                         first_name=self.fake.first_name(),
+                         last_name=self.fake.last_name())
+                    for name in names[start:start + self.batch_size]
+                ], ignore_conflicts=True)
+        return names
+
+    def groups(self, total):
+        slugs = [f'{self.prefix}-group-{number}' for number in range(total)]
+        Group.objects.bulk_create([
+            Group(slug=slug, title=self.fake.sentence(nb_words=3)[:200],
+                  description=self.fake.paragraph())
+            for slug in slugs
+        ], ignore_conflicts=True)
+        return slugs
+
+    def follows(self, users, per_user):
+        # Подписываются чаще всего на популярных авторов.
+        authors = Zipf(users, self.alpha, self.rng)
+        for user in users:
+            count = min(int(self.rng.expovariate(1 / per_user)), len(users))
+            for author in set(authors.pick(count)):
+                yield {'user': user, 'author': author}
+
+    def posts(self, users, groups, total, grouped=0.7):
+        authors = Zipf(users, self.alpha, self.rng)
+        group_picker = Zipf(groups, self.alpha, self.rng) if groups else None
+        start = timezone.now() - dt.timedelta(days=self.days)
+        step = dt.timedelta(days=self.days) / max(total, 1)
+        for number, author in enumerate(authors.pick(total)):
+            group = None
+            if group_picker and self.rng.random() < grouped:
+                group = group_picker.pick()[0]
+            yield {
+                'author': author,
+                'group': group,
+                'text': self.fake.paragraph(nb_sentences=4),
+                'pub_date': (start + step * number).isoformat(),
+            }
+
+    def comments(self, users, total):
+        # Свежие посты обсуждают больше: вес по рангу от самого нового.
+        post_ids = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('pk', flat=True))
+        if not post_ids:
+            return
+        posts = Zipf(post_ids, self.alpha, self.rng)
+        for post_id in posts.pick(total):
+            yield {
+                'post': post_id,
+                'author': self.rng.choice(users),
+                'text': self.fake.sentence(),
+            }
+
+    def run(self, users, groups, posts, comments, follows_per_user):
+        """Создаёт набор данных и возвращает число созданных объектов."""
+        names = self.users(users)
+        slugs = self.groups(groups)
+        importer = transfer.Importer(self.batch_size)
+        created = {'users': len(names), 'groups': len(slugs)}
+        # Подписки раньше постов: посты сразу разложатся по лентам.
+        for kind, rows in (
+            (transfer.FOLLOWS_KIND,
+             lambda: self.follows(names, follows_per_user)),
+            (transfer.POSTS, lambda: self.posts(names, slugs, posts)),
+            (transfer.COMMENTS_KIND, lambda: self.comments(names, comments)),
+        ):
+            before = importer.created
+            importer.run(kind, rows())
+            created[kind] = importer.created - before
+        return created
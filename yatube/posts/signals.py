@@ -0,0 +1,124 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, counts, images, timeline
+from .cache import COMMENTS, FEED, FOLLOWS, bump_on_commit, comments_scope
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    timeline.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feed(sender, **kwargs):
+    bump_on_commit(FEED)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    bump_on_commit(COMMENTS, comments_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follows(sender, **kwargs):
+    bump_on_commit(FOLLOWS)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_fields(sender, instance, raw=False, **kwargs):
+    if instance.pk is None or raw:
+        return
+    saved = sender.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'image').first()
+    if saved is not None:
+        instance._saved_group_id, instance._saved_image = saved
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counts.adjust(counts.scopes_for(instance), 1)
+        counters.shift_user(instance.author_id, posts_count=1)
+        counters.shift_group(instance.group_id, 1)
+        return
+    old_group_id = getattr(instance, '_saved_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            counts.adjust([counts.group_scope(old_group_id)], -1)
+        if instance.group_id is not None:
+            counts.adjust([counts.group_scope(instance.group_id)], 1)
+        counters.shift_group(old_group_id, -1)
+        counters.shift_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counts.adjust(counts.scopes_for(instance), -1)
+    counters.shift_user(instance.author_id, posts_count=-1)
+    counters.shift_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.shift_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.shift_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.shift_user(instance.user_id, following_count=1)
+        counters.shift_user(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.shift_user(instance.user_id, following_count=-1)
+    counters.shift_user(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_image = instance.image.name or ''
+    old_image = '' if created else (
+        getattr(instance, '_saved_image', new_image) or '')
+    if old_image == new_image:
+        return
+    if new_image:
+        images.retain(new_image)
+    if old_image:
+        images.release(old_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        images.release(instance.image.name)
@@ -0,0 +1,49 @@
+from django import template
+from django.conf import settings
+from django.template import Context
+from django.template.loader import get_template
+
+from core.reverse import reverse_one
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post_card.html'
+IMAGE_TEMPLATE = 'includes/post_image.html'
+
+_compiled = {}
+
+
+def compiled(context, name):
+    """Скомпилированный шаблон карточки.
+
+    В DEBUG шаблоны могут меняться на диске, поэтому они запоминаются
+    только до конца отрисовки текущей страницы.
+    """
+    cache = _compiled
+    if settings.DEBUG:
+        cache = context.render_context.setdefault('post_cards', {})
+    found = cache.get(name)
+    if found is None:
+        found = cache[name] = get_template(name).template
+    return found
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post, geometry='card', group_link=True):
+    """Карточка поста для лент.
+
+    Карточка рисуется в собственном маленьком контексте, адреса
+    собираются по запомненным шаблонам, а картинка подключается уже
+    скомпилированным шаблоном, без поиска через загрузчики.
+    """
+    group_url = None
+    if group_link and post.group_id is not None:
+        group_url = reverse_one('posts:group_list', post.group.slug)
+    return compiled(context, CARD_TEMPLATE).render(Context({
+        'post': post,
+        'geometry': geometry,
+        'image_template': compiled(context, IMAGE_TEMPLATE),
+        'profile_url': reverse_one('posts:profile', post.author.username),
+        'detail_url': reverse_one('posts:post_detail', post.pk),
+        'group_url': group_url,
+    }, autoescape=context.autoescape))
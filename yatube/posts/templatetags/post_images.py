@@ -0,0 +1,27 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, name):
+    """Загружает миниатюры всей страницы одним обращением к хранилищу."""
+    thumbnails.prefetch(posts, name)
+    return ''
+
+
+@register.simple_tag
+def pregenerated_thumbnail(post, name):
+    """Готовые варианты миниатюры картинки поста или None.
+
+    Шаблон не обрабатывает картинки сам: недостающие миниатюры
+    ставятся в очередь и появятся на следующих показах.
+    """
+    if not post.image:
+        return None
+    prefetched = getattr(post, 'thumbnails', {})
+    if name in prefetched:
+        return prefetched[name]
+    return thumbnails.lookup(post.image, name)
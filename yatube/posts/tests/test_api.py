@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+from ..paginators import encode_cursor
+
+
+@override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {number}')
+            for number in range(settings.FILL + 3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_page_by_cursor(self):
+        """Ленты отдаются JSON-страницами и листаются курсором."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile', args=[self.author.username]),
+        )
+        newest = [post.pk for post in reversed(self.posts)]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url).json()
+                self.assertEqual([item['id'] for item in first['results']],
+                                 newest[:settings.FILL])
+                self.assertIsNone(first['previous'])
+                second = self.guest_client.get(
+                    url, {'cursor': first['next']}).json()
+                self.assertEqual([item['id'] for item in second['results']],
+                                 newest[settings.FILL:])
+                self.assertIsNone(second['next'])
+
+    def test_fields_select_columns(self):
+        """Параметр fields оставляет в ответе только выбранные поля."""
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'id,author'})
+        self.assertEqual(response.json()['results'][0],
+                         {'id': self.posts[-1].pk, 'author': 'author'})
+        detail = self.guest_client.get(
+            reverse('api:post_detail', args=[self.posts[0].pk])).json()
+        self.assertEqual(detail['group'], 'group')
+        self.assertEqual(detail['text'], 'Пост 0')
+        self.assertIsNone(detail['image'])
+
+    def test_errors_are_json(self):
+        """Ошибки запроса отдаются JSON с подходящим статусом."""
+        cases = (
+            (reverse('api:index'), {'fields': 'id,password'}, 400),
+            (reverse('api:index'), {'cursor': 'битый'}, 400),
+            (reverse('api:index'), {'cursor': encode_cursor(
+                ['2020-01-01T00:00:00', 10 ** 30])}, 400),
+            (reverse('api:index'), {'cursor': encode_cursor(
+                ['не дата', 1])}, 400),
+            (reverse('api:group_posts', args=['missing']), {}, 404),
+            (reverse('api:post_detail', args=[0]), {}, 404),
+            (reverse('api:follow_index'), {}, 401),
+        )
+        for url, params, status in cases:
+            with self.subTest(url=url, params=params):
+                response = self.guest_client.get(url, params)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+                self.assertFalse(response.has_header('ETag'))
+
+    def test_guest_follow_feed_checks_auth_before_etag(self):
+        """Аноним получает 401, даже если прислал подходящий ETag."""
+        url = reverse('api:follow_index')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 401)
+
+    def test_follow_feed(self):
+        """В ленте подписок — посты авторов, на которых подписан читатель."""
+        url = reverse('api:follow_index')
+        self.assertEqual(self.reader_client.get(url).json()['results'], [])
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertTrue(Follow.objects.filter(user=self.reader).exists())
+        results = self.reader_client.get(url).json()['results']
+        self.assertEqual(results[0]['id'], self.posts[-1].pk)
+
+    def test_unchanged_feed_returns_not_modified(self):
+        """Повторный запрос с ETag получает 304 без запросов к базе."""
+        url = reverse('api:index')
+        # Страница ленты — один запрос к постам, без моделей и шаблонов.
+        with self.assertNumQueries(1):
+            etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.queries import QueryBudget
+from yatube.wsgi import application
+
+from .. import loadtest
+from ..seed import Seeder
+
+# Бюджеты страниц posts.urls при холодном кэше: число запросов не должно
+# расти с числом постов, время SQL взято с большим запасом. Здесь только
+# пределы: QueryBudget на каждую проверку создаётся свой.
+BUDGETS = {
+    'posts:index': dict(queries=1, ms=100),
+    'posts:group_list': dict(queries=2, ms=100),
+    'posts:profile': dict(queries=2, ms=100),
+    'posts:post_detail': dict(queries=3, ms=100),
+    'posts:post_comments': dict(queries=2, ms=100),
+    'posts:search': dict(queries=2, ms=100),
+    # Сессия и пользователь читаются из базы.
+    'posts:follow_index': dict(queries=3, ms=100),
+}
+
+
+class QueryBudgetMixin:
+    """Проверяет бюджеты на наборе данных размера USERS × POSTS."""
+
+    USERS = None
+    POSTS = None
+
+    @classmethod
+    def setUpTestData(cls):
+        Seeder(seed=cls.POSTS).run(
+            users=cls.USERS, groups=3, posts=cls.POSTS,
+            comments=cls.POSTS, follows_per_user=3)
+
+    def test_pages_fit_query_budgets(self):
+        """Страницы укладываются в бюджет запросов и времени SQL."""
+        planner = loadtest.Planner(seed=1, logged_in=0)
+        for name, limits in BUDGETS.items():
+            with self.subTest(name=name, posts=self.POSTS):
+                request = planner.request(name)
+                cache.clear()
+                with QueryBudget(**limits,
+                                 label=f'{name} ({self.POSTS} постов)'):
+                    _, status, _ = loadtest.call(application, request)
+                self.assertEqual(status, 200)
+
+    def test_every_page_has_budget(self):
+        """У каждой страницы нагрузочного плана есть бюджет."""
+        self.assertEqual(set(BUDGETS), set(loadtest.MIX))
+
+
+class SmallDatasetBudgetTest(QueryBudgetMixin, TestCase):
+    USERS = 5
+    POSTS = 20
+
+
+class LargeDatasetBudgetTest(QueryBudgetMixin, TestCase):
+    USERS = 40
+    POSTS = 400
@@ -1,10 +1,14 @@
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.db import connection, transaction
 from django.test import Client, TestCase
 from django.urls import reverse
 
+from ..cache import FEED, get_version
 from ..models import Group, Post
 
+from yatube.settings import FILL
+
 User = get_user_model()
 
 
@@ -30,22 +34,76 @@ class PaginatorViewsTest(TestCase):
             text='Тестовый текст',
         )
 
+    def setUp(self):
+        cache.clear()
+
+    def run_on_commit(self):
+        # TestCase не фиксирует транзакцию, поэтому отложенные
+        # обработчики вызываются вручную.
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for _, callback in callbacks:
+            callback()
+
     def test_cache_on_index_page_works_correct(self):
-        """Кэширование данных на главной странице работает корректно."""
+        """Кэш главной страницы сбрасывается при изменении постов."""
         response = self.authorized_client.get(reverse('posts:index'))
         cached_content = response.content
-        Post.objects.all().delete()
         response = self.authorized_client.get(reverse('posts:index'))
-        cached_content_after_delete = response.content
         self.assertEqual(
             cached_content,
-            cached_content_after_delete,
+            response.content,
             'Кэширование работает некорректно.'
         )
-        cache.clear()
+        Post.objects.all().delete()
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(
             cached_content,
             response.content,
-            'Кэширование после очистки работает некорректно'
+            'Кэш не сбрасывается после удаления постов'
+        )
+        self.assertNotContains(response, self.post.text)
+
+    def test_feed_version_changes_again_after_commit(self):
+        """Версия, выданная до фиксации транзакции, после неё устаревает."""
+        before = get_version(FEED)
+        with transaction.atomic():
+            Post.objects.create(author=self.test_user, text='Новый пост')
+            uncommitted = get_version(FEED)
+        self.assertNotEqual(uncommitted, before)
+        self.run_on_commit()
+        self.assertNotIn(get_version(FEED), (before, uncommitted))
+
+    def test_cached_index_page_does_not_query_database(self):
+        """Повторный запрос главной страницы не обращается к базе."""
+        guest_client = Client()
+        guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            guest_client.get(reverse('posts:index'))
+
+    def test_index_pages_are_cached_separately(self):
+        """Каждая страница ленты кэшируется под своим ключом."""
+        Post.objects.bulk_create(
+            Post(author=self.test_user, text=f'Пост {number}')
+            for number in range(FILL)
+        )
+        first = self.authorized_client.get(reverse('posts:index'))
+        cursor = first.context['paginator'].next_cursor
+        second = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': cursor})
+        self.assertContains(second, self.post.text)
+        self.assertNotContains(first, self.post.text)
+
+    def test_index_shows_new_comment_count(self):
+        """После комментария главная показывает новое число комментариев."""
+        guest_client = Client()
+        for client in (self.authorized_client, guest_client):
+            self.assertContains(
+                client.get(reverse('posts:index')), 'Комментариев: 0')
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
         )
+        for client in (self.authorized_client, guest_client):
+            with self.subTest(client=client):
+                self.assertContains(
+                    client.get(reverse('posts:index')), 'Комментариев: 1')
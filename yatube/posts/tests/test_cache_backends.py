@@ -0,0 +1,124 @@
+import time
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from core.cache_backends import SQLiteCache, TwoTierCache
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.cache = caches['shared']
+        self.cache.clear()
+
+    def test_add_is_exclusive(self):
+        """add кладёт значение, только если ключа ещё нет."""
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_expired_entries_are_missing(self):
+        """Истёкшая запись не читается и может быть добавлена заново."""
+        self.cache.set('key', 1, -1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 2))
+
+    def test_incr_and_get_many(self):
+        """incr меняет число, get_many возвращает только найденное."""
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.incr('a', 5), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertEqual(self.cache.get_many(['a', 'b']), {'a': 6})
+
+    def test_cull_keeps_entries_without_expiry(self):
+        """При переполнении бессрочные записи вытесняются последними."""
+        small = SQLiteCache('file:cull-test?mode=memory&cache=shared',
+                            {'OPTIONS': {'MAX_ENTRIES': 10}})
+        small.set('permanent', 1, None)
+        for number in range(200):
+            small.set(f'key{number}', number, 60)
+        self.assertEqual(small.get('permanent'), 1)
+        self.assertIsNone(small.get('key0'))
+
+
+class TwoTierCacheTest(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        # Два «процесса» с собственными ярусами и общим кэшем.
+        self.first = self.worker('first')
+        self.second = self.worker('second')
+
+    def worker(self, name, **options):
+        options.setdefault('POLL_INTERVAL', 0)
+        return TwoTierCache(f'{self.id()}:{name}', {
+            'OPTIONS': dict(options, SHARED='shared'),
+        })
+
+    def test_changes_reach_other_workers(self):
+        """Перезапись, удаление и очистка видны в другом процессе."""
+        self.first.set('key', 1)
+        self.assertEqual(self.second.get('key'), 1)
+        self.first.set('key', 2)
+        self.assertEqual(self.second.get('key'), 2)
+        self.first.incr('key')
+        self.assertEqual(self.second.get('key'), 3)
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+        self.first.set('key', 4)
+        self.second.get('key')
+        self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение обходится без общего кэша до изменения ключа."""
+        worker = self.worker('lazy', POLL_INTERVAL=60)
+        self.first.set('key', 1)
+        self.assertEqual(worker.get('key'), 1)
+        caches['shared'].set('key', 2)
+        self.assertEqual(worker.get('key'), 1)
+        self.assertEqual(worker.get_many(['key']), {'key': 1})
+
+    def test_write_drops_only_changed_key(self):
+        """Запись одного ключа не сбрасывает чужой ярус целиком."""
+        worker = self.worker('reader')
+        self.first.set('a', 1)
+        self.first.set('b', 1)
+        worker.get_many(['a', 'b'])
+        # Мимо журнала: чтение b из яруса этого не заметит.
+        caches['shared'].set('b', 'в обход')
+        self.first.set('a', 2)
+        self.first.incr('a')
+        self.assertEqual(worker.get('a'), 3)
+        self.assertEqual(worker.get('b'), 1)
+
+    def test_readded_key_reaches_other_workers(self):
+        """Ключ, вытесненный из общего кэша и добавленный снова, виден."""
+        self.first.set('key', 1)
+        self.assertEqual(self.second.get('key'), 1)
+        caches['shared'].delete('key')
+        self.assertTrue(self.first.add('key', 2))
+        self.assertEqual(self.second.get('key'), 2)
+        caches['shared'].delete('key')
+        self.first.set('key', 3)
+        self.assertEqual(self.second.get('key'), 3)
+
+    def test_local_copy_expires_with_shared_entry(self):
+        """Локальная копия живёт не дольше записи в общем кэше."""
+        worker = self.worker('lazy', POLL_INTERVAL=60, LOCAL_TIMEOUT=60)
+        caches['shared'].set('short', 1, 5)
+        caches['shared'].set('long', 1, None)
+        worker.get('short')
+        worker.get_many(['long'])
+        expires = {key: worker.tier.entries[worker.key(key, None)][1]
+                   for key in ('short', 'long')}
+        self.assertLessEqual(expires['short'], time.monotonic() + 5)
+        self.assertGreater(expires['long'], time.monotonic() + 55)
+
+    def test_local_tier_is_bounded(self):
+        """Локальный ярус вытесняет давно не читанные записи."""
+        worker = self.worker('small', MAX_ENTRIES=2)
+        for key in 'abc':
+            worker.set(key, key)
+        worker.get('a')
+        self.assertEqual(list(worker.tier.entries), [':1:c', ':1:a'])
@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import QueryRecorder
+
+from ..models import Comment, Post, User
+
+PER_PAGE = 5
+
+
+@override_settings(COMMENTS_PER_PAGE=PER_PAGE)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        commenters = [
+            User.objects.create_user(username=f'reader_{number}')
+            for number in range(3)
+        ]
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=commenters[number % 3],
+                text=f'Комментарий {number}',
+            )
+            for number in range(PER_PAGE * 2 + 2)
+        )
+        cls.expected = list(cls.post.comments.order_by('created', 'id'))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_detail_shows_first_page_of_comments(self):
+        """Страница поста выводит только первую страницу комментариев."""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertEqual(
+            list(response.context['comments']), self.expected[:PER_PAGE])
+        self.assertContains(
+            response, reverse('posts:post_comments', args=[self.post.pk]))
+
+    def test_load_more_continues_in_stable_order(self):
+        """«Показать ещё» продолжает список с места остановки."""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        cursor = response.context['comments_paginator'].next_cursor
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'cursor': cursor},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            list(response.context['comments']),
+            self.expected[PER_PAGE:PER_PAGE * 2],
+        )
+
+    @override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+    def test_detail_cost_does_not_grow_with_comments(self):
+        """Число запросов страницы поста не зависит от числа комментариев."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        with QueryRecorder() as few:
+            self.guest_client.get(url)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text='Ещё')
+            for _ in range(PER_PAGE * 10)
+        )
+        with QueryRecorder() as many:
+            self.guest_client.get(url)
+        self.assertEqual(len(few.queries), len(many.queries))
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+# Готовые страницы из кэша отвечают на If-None-Match сами, здесь
+# проверяются валидаторы самих view.
+@override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Неизменившиеся страницы отдают 304 не дороже одного запроса."""
+        # Лентам хватает версий из кэша, посту — запроса к комментариям.
+        urls = (
+            (reverse('posts:index'), 0),
+            (reverse('posts:group_list', args=[self.group.slug]), 0),
+            (reverse('posts:profile', args=[self.author.username]), 0),
+            (reverse('posts:post_detail', args=[self.post.pk]), 1),
+        )
+        for url, queries in urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(queries):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_changes_invalidate_validators(self):
+        """Посты, комментарии и подписки меняют валидаторы страниц."""
+        detail = reverse('posts:post_detail', args=[self.post.pk])
+        profile = reverse('posts:profile', args=[self.author.username])
+        changes = (
+            (detail, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Ответ')),
+            (profile, lambda: Follow.objects.create(
+                user=self.reader, author=self.author)),
+            (reverse('posts:index'), lambda: Post.objects.create(
+                author=self.author, text='Новый пост')),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                change()
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_validator_depends_on_user(self):
+        """Гость и авторизованный читатель получают разные ETag."""
+        url = reverse('posts:index')
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        self.assertNotEqual(
+            self.guest_client.get(url)['ETag'], reader_client.get(url)['ETag'])
@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, User, UserCounters
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_follow_create_and_delete_paths(self):
+        """Счётчики меняются при публикации, комментарии и подписке."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий'})
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+
+    def test_pages_read_counters_without_aggregates(self):
+        """Профиль и страница поста берут числа из счётчиков."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        UserCounters.objects.filter(user=self.author).update(posts_count=7)
+        response = self.reader_client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual(response.context['post_count'], 7)
+        response = self.reader_client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(response.context['count_user_posts'], 7)
+        self.assertFalse(response.context['following'])
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserCounters.objects.all().delete()
+        Group.objects.update(posts_count=5)
+        Post.objects.update(comment_count=0)
+        out = StringIO()
+        call_command('recount', workers=1, stdout=out)
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        self.assertIn('Исправлено счётчиков групп: 1', out.getvalue())
+
+    def test_full_save_keeps_concurrent_shifts(self):
+        """Правка поста и группы не затирает сдвиги счётчиков."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+        group = Group.objects.get(pk=self.group.pk)
+        counters.shift_post(post.pk, 1)
+        counters.shift_group(group.pk, 1)
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.post(reverse('posts:post_edit', args=[post.pk]),
+                           {'text': 'Правка', 'group': group.pk})
+        post.text = 'Ещё правка'
+        post.save()
+        group.title = 'Новое название'
+        group.save()
+        post.refresh_from_db()
+        group.refresh_from_db()
+        self.assertEqual((post.text, post.comment_count), ('Ещё правка', 1))
+        self.assertEqual((group.title, group.posts_count),
+                         ('Новое название', 2))
+
+    def test_recount_writes_current_values(self):
+        """recount берёт значения в момент записи, а не из подсчёта."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+        stale = counters.count_posts([post.pk])
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        counters.recount_posts(stale)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
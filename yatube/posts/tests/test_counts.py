@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import counts
+from ..models import Group, Post, User
+
+
+class CountsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def cached(self, scope):
+        return cache.get(counts.COUNT_KEY.format(scope))
+
+    def run_on_commit(self):
+        # TestCase не фиксирует транзакцию, поэтому отложенные
+        # обработчики вызываются вручную.
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for _, callback in callbacks:
+            callback()
+
+    def test_counts_follow_post_create_edit_and_delete(self):
+        """Счётчики в кэше меняются вместе с постами без пересчёта."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+        self.run_on_commit()
+        self.guest_client.get(
+            reverse('posts:profile', args=[self.author.username]),
+            {'page': 1})
+        self.guest_client.get(
+            reverse('posts:group_list', args=[self.group.slug]),
+            {'page': 1})
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.run_on_commit()
+        self.assertEqual(self.cached(counts.author_scope(self.author.pk)), 2)
+        post.group = self.other_group
+        post.save()
+        self.run_on_commit()
+        self.assertEqual(self.cached(counts.group_scope(self.group.pk)), 0)
+        post.delete()
+        self.run_on_commit()
+        self.assertEqual(self.cached(counts.author_scope(self.author.pk)), 1)
+
+    def test_change_during_first_count_is_not_lost(self):
+        """Пост, созданный во время подсчёта, не теряется в счётчике."""
+        queryset = Post.objects.all()
+        count = queryset.count
+
+        def count_then_create():
+            value = count()
+            Post.objects.create(author=self.author, text='Пост')
+            self.run_on_commit()
+            return value
+
+        queryset.count = count_then_create
+        counts.cached_count(counts.ALL, queryset)
+        self.assertEqual(
+            counts.cached_count(counts.ALL, Post.objects.all()), 1)
+
+    def test_rolled_back_post_does_not_shift_count(self):
+        """Откат транзакции не оставляет в кэше сдвинутый счётчик."""
+        counts.cached_count(counts.ALL, Post.objects.all())
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Post.objects.create(author=self.author, text='Пост')
+                raise IntegrityError
+        self.run_on_commit()
+        self.assertEqual(self.cached(counts.ALL), 0)
+
+    def test_approximate_count_reads_bounded_rows(self):
+        """Приблизительный подсчёт оценивает размер по диапазону ключей."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(30)
+        )
+        queryset = Post.objects.filter(author=self.author)
+        self.assertEqual(counts.approximate_count(queryset, 10), 30)
+        self.assertEqual(counts.approximate_count(queryset, 100), 30)
+
+    @override_settings(COUNT_APPROXIMATE=True,
+                       COUNT_APPROXIMATE_THRESHOLD=5)
+    def test_approximate_mode_is_used_on_cache_miss(self):
+        """В приблизительном режиме промах кэша не считает всю выборку."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(12)
+        )
+        scope = counts.author_scope(self.author.pk)
+        queryset = Post.objects.filter(author=self.author)
+        self.assertEqual(counts.cached_count(scope, queryset), 12)
+        self.assertEqual(self.cached(scope), 12)
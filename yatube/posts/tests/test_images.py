@@ -0,0 +1,71 @@
+import hashlib
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, StoredImage, User
+from .test_thumbnails import SMALL_GIF
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class StoredImagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def run_on_commit(self):
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for _, callback in callbacks:
+            callback()
+
+    def create_post(self, filename):
+        self.author_client.post(reverse('posts:post_create'), {
+            'text': f'Пост с {filename}',
+            'image': SimpleUploadedFile(
+                filename, SMALL_GIF, content_type='image/gif'),
+        })
+        return Post.objects.latest('pk')
+
+    def test_same_image_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом под хэшем."""
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        # Маленький лимит отправляет вторую загрузку во временный файл.
+        first = self.create_post('first.gif')
+        with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1):
+            second = self.create_post('second.GIF')
+        self.assertEqual(first.image.name, f'posts/{digest[:2]}/{digest}.gif')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(
+            StoredImage.objects.get(name=first.image.name).references, 2)
+
+    def test_file_is_deleted_with_last_reference(self):
+        """Файл удаляется только вместе с последним ссылающимся постом."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        storage, name = first.image.storage, first.image.name
+        first.delete()
+        self.run_on_commit()
+        self.assertTrue(storage.exists(name))
+        second.delete()
+        self.run_on_commit()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+HASHED = 'cache/ab/cd/abcdef0123456789abcdef0123456789.jpg'
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in (HASHED, 'posts/photo.jpg'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def get(self, name, **headers):
+        return self.client.get(settings.MEDIA_URL + name, **headers)
+
+    def test_hashed_files_are_cached_forever(self):
+        """Файлы с хэшем в имени кэшируются навсегда, прочие — на час."""
+        response = self.get(HASHED)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertNotIn('immutable', self.get('posts/photo.jpg')[
+            'Cache-Control'])
+
+    def test_validators_return_not_modified(self):
+        """Совпавший ETag или дата изменения дают 304 без тела."""
+        response = self.get(HASHED)
+        for headers in ({'HTTP_IF_NONE_MATCH': response['ETag']},
+                        {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']}):
+            with self.subTest(headers=headers):
+                self.assertEqual(self.get(HASHED, **headers).status_code, 304)
+
+    def test_range_requests(self):
+        """Запрос диапазона отдаёт только запрошенные байты."""
+        response = self.get(HASHED, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        suffix = self.get(HASHED, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(suffix.streaming_content), CONTENT[-4:])
+        stale = self.get(
+            HASHED, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(
+            self.get(HASHED, HTTP_RANGE='bytes=5000-').status_code, 416)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect')
+    def test_front_server_delivers_bytes(self):
+        """С фронт-сервером Django отдаёт только заголовок перенаправления."""
+        response = self.get(HASHED)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         settings.MEDIA_ACCEL_PREFIX + HASHED)
+        self.assertEqual(response.content, b'')
+
+    def test_paths_outside_media_root_are_not_found(self):
+        """Пути за пределами MEDIA_ROOT и каталоги не отдаются."""
+        for name in ('../manage.py', 'posts/', 'missing.jpg'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code, 404)
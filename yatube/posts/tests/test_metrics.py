@@ -0,0 +1,114 @@
+from django.core.cache import cache, caches
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import metrics
+
+from ..models import Post, User
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        caches['metrics'].clear()
+        metrics.registry.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def scrape(self):
+        response = self.staff_client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_metrics_are_staff_only(self):
+        """Метрики видит только персонал."""
+        self.assertEqual(Client().get('/metrics').status_code, 403)
+        user_client = Client()
+        user_client.force_login(self.author)
+        self.assertEqual(user_client.get('/metrics').status_code, 403)
+
+    def test_request_metrics_per_view(self):
+        """Ответы, SQL и отрисовка считаются по имени view."""
+        Client().get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn('yatube_requests_total'
+                      '{view="posts:index",status="200",worker="1"} 1', text)
+        self.assertIn('yatube_request_seconds_count'
+                      '{view="posts:index",worker="1"} 1', text)
+        self.assertIn('yatube_request_queries_bucket'
+                      '{view="posts:index",worker="1",le="0"} 0', text)
+        self.assertIn('yatube_request_render_seconds_count'
+                      '{view="posts:index",worker="1"} 1', text)
+
+    def test_page_cache_hits_keep_view_name(self):
+        """Ответ из кэша страниц записывается на тот же view."""
+        for _ in range(2):
+            Client().get(reverse('posts:index'))
+        self.assertIn('yatube_requests_total'
+                      '{view="posts:index",status="200",worker="1"} 2',
+                      self.scrape())
+
+    def test_cache_hits_by_key_prefix(self):
+        """Попадания и промахи кэша считаются по префиксу ключа."""
+        cache.get('posts:count:group:3')
+        cache.set('posts:count:group:3', 1)
+        cache.get('posts:count:group:3')
+        text = self.scrape()
+        self.assertIn('yatube_cache_requests_total{prefix="posts:count",'
+                      'result="miss",worker="1"} 1', text)
+        self.assertIn('yatube_cache_requests_total{prefix="posts:count",'
+                      'result="hit",worker="1"} 1', text)
+
+    def test_workers_have_own_series(self):
+        """Снимки воркеров отдаются отдельными сериями с меткой worker."""
+        shared = caches['metrics']
+        labels = (('view', 'posts:index'), ('status', '200'))
+        shared.add(metrics.SLOTS_KEY, 0, None)
+        slot = shared.incr(metrics.SLOTS_KEY)
+        shared.set(metrics.WORKER_KEY.format(slot),
+                   {('yatube_requests_total', labels): 5}, None)
+        Client().get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn('yatube_requests_total'
+                      '{view="posts:index",status="200",worker="1"} 5', text)
+        self.assertIn('yatube_requests_total'
+                      '{view="posts:index",status="200",worker="2"} 1', text)
+
+    def test_lost_slot_counter_does_not_reuse_live_slot(self):
+        """Без счётчика номеров воркер не займёт номер живого процесса."""
+        shared = caches['metrics']
+        shared.set(metrics.WORKER_KEY.format(1), {}, None)
+        metrics.registry.flush()
+        self.assertEqual(metrics.registry.slot, 2)
+
+    def test_histogram_format(self):
+        """Гистограмма выводится накопленными корзинами, суммой и числом."""
+        registry = metrics.Registry()
+        registry.observe('yatube_thumbnail_seconds', (), 0.003)
+        registry.observe('yatube_thumbnail_seconds', (), 20)
+        text = metrics.render(registry.snapshot())
+        self.assertIn('yatube_thumbnail_seconds_bucket{le="0.001"} 0', text)
+        self.assertIn('yatube_thumbnail_seconds_bucket{le="0.005"} 1', text)
+        self.assertIn('yatube_thumbnail_seconds_bucket{le="10"} 1', text)
+        self.assertIn('yatube_thumbnail_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('yatube_thumbnail_seconds_sum 20.003', text)
+        self.assertIn('yatube_thumbnail_seconds_count 2', text)
+
+    def test_cache_prefix(self):
+        """Префикс ключа отбрасывает изменяемую часть."""
+        self.assertEqual(metrics.cache_prefix('posts:version:feed'),
+                         'posts:version')
+        self.assertEqual(metrics.cache_prefix('pagecache:1f0e9a'),
+                         'pagecache')
+        self.assertEqual(
+            metrics.cache_prefix('template.cache.index_page.abc'),
+            'template.cache')
+        self.assertEqual(metrics.cache_prefix('42'), 'other')
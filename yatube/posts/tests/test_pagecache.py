@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_anonymous_hit_skips_database(self):
+        """Повторный анонимный запрос отдаётся из кэша без запросов."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertEqual(second.content, first.content)
+        not_modified = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_logged_in_users_bypass_cache(self):
+        """Авторизованный пользователь не получает анонимную страницу."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.get(url)
+        self.assertContains(response, self.reader.username)
+
+    def test_changes_reach_cached_pages(self):
+        """Посты, комментарии и подписки сбрасывают свои страницы."""
+        changes = (
+            (reverse('posts:post_detail', args=[self.post.pk]),
+             lambda: Comment.objects.create(
+                 post=self.post, author=self.reader, text='Новый ответ'),
+             'Новый ответ'),
+            (reverse('posts:profile', args=[self.author.username]),
+             lambda: Follow.objects.create(
+                 user=self.reader, author=self.author),
+             'Подписчиков: 1'),
+            (reverse('posts:index'),
+             lambda: Post.objects.create(author=self.author, text='Свежий'),
+             'Свежий'),
+        )
+        for url, change, text in changes:
+            with self.subTest(url=url):
+                self.assertNotContains(self.guest_client.get(url), text)
+                change()
+                self.assertContains(self.guest_client.get(url), text)
+
+    def test_language_is_part_of_key(self):
+        """Разные языки получают разные записи кэша."""
+        url = reverse('posts:index')
+        self.guest_client.get(url, HTTP_ACCEPT_LANGUAGE='ru')
+        with self.assertNumQueries(0):
+            self.guest_client.get(url, HTTP_ACCEPT_LANGUAGE='ru')
+        response = self.guest_client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertIsNotNone(response.context)
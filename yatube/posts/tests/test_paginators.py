@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import (
+    CursorPaginator, InvalidCursor, decode_cursor, encode_cursor)
+
+from yatube.settings import FILL
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Пост номер {item}')
+            for item in range(FILL * 2 + 3)
+        ])
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def walk(self, paginator):
+        page = paginator.get_page(None)
+        pages = [list(page)]
+        while page.has_next():
+            page = paginator.get_page(page.paginator.next_cursor)
+            pages.append(list(page))
+        return page, pages
+
+    def test_cursor_walk_returns_every_post_once(self):
+        """Проход по курсорам возвращает все посты по порядку."""
+        _, pages = self.walk(CursorPaginator(Post.objects.all(), FILL))
+        self.assertEqual([len(page) for page in pages], [FILL, FILL, 3])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу целиком."""
+        paginator = CursorPaginator(Post.objects.all(), FILL)
+        last, pages = self.walk(paginator)
+        previous = paginator.get_page(last.paginator.previous_cursor)
+        self.assertEqual(list(previous), pages[-2])
+        self.assertTrue(previous.has_next())
+        self.assertTrue(previous.has_previous())
+
+    def test_broken_cursor_opens_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('не-курсор')
+        page = CursorPaginator(Post.objects.all(), FILL).get_page('xyz')
+        self.assertEqual(list(page), self.expected[:FILL])
+        self.assertFalse(page.has_previous())
+
+    def test_cursor_with_wrong_value_types_opens_first_page(self):
+        """Курсор со значениями не тех типов не роняет ленты."""
+        cursors = [
+            encode_cursor([['x', 'y'], 'z']),
+            encode_cursor(['не дата', 1]),
+            encode_cursor(['2020-01-01T00:00:00', 'не число']),
+            encode_cursor([None, None]),
+            encode_cursor(['2020-01-01T00:00:00', 10 ** 30]),
+        ]
+        paginator = CursorPaginator(Post.objects.all(), FILL)
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page(cursor)
+                self.assertEqual(list(paginator.get_page(cursor)),
+                                 self.expected[:FILL])
+        self.guest_client.force_login(self.author)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, {'cursor': cursors[0]})
+                self.assertEqual(response.status_code, 200)
+
+    def test_views_follow_cursor_links(self):
+        """Ленты переходят по курсору, а ?page=N работает по-прежнему."""
+        first = self.guest_client.get(reverse('posts:index'))
+        cursor = first.context['paginator'].next_cursor
+        self.assertContains(first, f'?cursor={cursor}')
+        second = self.guest_client.get(
+            reverse('posts:profile', args=[self.author.username]),
+            {'cursor': cursor},
+        )
+        self.assertEqual(
+            list(second.context['page_obj']), self.expected[FILL:FILL * 2]
+        )
+        legacy = self.guest_client.get(
+            reverse('posts:profile', args=[self.author.username]),
+            {'page': 3},
+        )
+        self.assertEqual(list(legacy.context['page_obj']), self.expected[-3:])
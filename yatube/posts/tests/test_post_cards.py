@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import clear_script_prefix, reverse, set_script_prefix
+
+from core.reverse import reverse_one
+
+from ..models import Group, Post, User
+
+
+class PostCardTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='автор.+@-', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='<b>Текст</b>')
+
+    def test_reverse_one_matches_reverse(self):
+        """Адреса по запомненным шаблонам совпадают с reverse."""
+        cases = (
+            ('posts:profile', self.author.username),
+            ('posts:group_list', self.group.slug),
+            ('posts:post_detail', self.post.pk),
+        )
+        for viewname, value in cases:
+            with self.subTest(viewname=viewname):
+                self.assertEqual(reverse_one(viewname, value),
+                                 reverse(viewname, args=[value]))
+        set_script_prefix('/yatube/')
+        try:
+            self.assertEqual(reverse_one('posts:post_detail', 5),
+                             '/yatube/posts/5/')
+        finally:
+            clear_script_prefix()
+
+    def test_post_card_renders_links(self):
+        """Карточка содержит ссылки на автора, пост и группу."""
+        template = Template(
+            '{% load post_cards %}{% post_card post %}'
+            '{% post_card post group_link=False %}')
+        html = template.render(Context({'post': self.post}))
+        self.assertIn(reverse('posts:profile', args=[self.author.username]),
+                      html)
+        self.assertIn(reverse('posts:post_detail', args=[self.post.pk]),
+                      html)
+        self.assertEqual(
+            html.count(reverse('posts:group_list', args=[self.group.slug])),
+            1)
+        self.assertIn('&lt;b&gt;Текст&lt;/b&gt;', html)
+
+    def test_bench_cards_appends_history(self):
+        """Бенчмарк карточек дописывает результаты в файл истории."""
+        with tempfile.TemporaryDirectory() as directory:
+            history = os.path.join(directory, 'cards.jsonl')
+            for _ in range(2):
+                call_command('bench_cards', cards=[1, 3], repeat=1,
+                             history=history, stdout=StringIO())
+            with open(history) as file:
+                runs = [json.loads(line) for line in file]
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(
+            [(row['template'], row['cards']) for row in runs[0]['results']],
+            [('include', 1), ('include', 3),
+             ('post_card', 1), ('post_card', 3)])
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import RepeatedQueriesMiddleware
+from core.queries import QueryBudget, QueryBudgetExceeded, QueryRecorder
+
+from ..models import Comment, Group, Post, User
+
+
+class RepeatedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for number in range(3):
+            author = User.objects.create_user(username=f'author_{number}')
+            post = Post.objects.create(
+                author=author, group=cls.group, text=f'Пост {number}')
+            Comment.objects.create(post=post, author=author, text='Ответ')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_recorder_reports_template_origin(self):
+        """Повторяющиеся запросы находятся вместе со строкой шаблона."""
+        template = Template(
+            '{% for post in posts %}\n{{ post.author.username }}{% endfor %}')
+        with QueryRecorder() as recorder:
+            template.render(Context({'posts': Post.objects.all()}))
+        repeated = recorder.repeated(3)
+        self.assertEqual(len(repeated), 1)
+        queries, = repeated.values()
+        self.assertEqual({query.origin for query in queries},
+                         {'<unknown source>:2'})
+
+    @override_settings(NPLUSONE_DETECTION=True, NPLUSONE_THRESHOLD=2)
+    def test_middleware_flags_repeated_queries(self):
+        """Middleware помечает ответ с повторяющимися запросами."""
+        def view(request):
+            for post in Post.objects.all():
+                post.author.username
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        with self.assertLogs('core.queries', 'WARNING'):
+            response = RepeatedQueriesMiddleware(view)(request)
+        self.assertEqual(response['X-Repeated-Queries'], '1')
+
+    def test_feeds_render_in_constant_number_of_queries(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=['author_0']),
+            reverse('posts:post_detail', args=[Post.objects.first().pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with QueryRecorder() as recorder:
+                    self.guest_client.get(url)
+                self.assertFalse(
+                    recorder.repeated(2), recorder.report())
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}') for number in range(3))
+
+    def test_budget_reports_queries_and_template_origin(self):
+        """Превышение бюджета показывает запросы и строку шаблона."""
+        template = Template(
+            '{% for post in posts %}\n{{ post.author.username }}{% endfor %}')
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with QueryBudget(queries=2, label='лента'):
+                template.render(Context({'posts': Post.objects.all()}))
+        message = str(raised.exception)
+        self.assertIn('лента: запросов 4, бюджет 2', message)
+        self.assertIn('<unknown source>:2', message)
+
+    def test_budget_checks_sql_time(self):
+        """Бюджет ограничивает и суммарное время SQL."""
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'время SQL'):
+            with QueryBudget(ms=0):
+                list(Post.objects.all())
+
+    def test_budget_works_as_decorator(self):
+        """Бюджет можно повесить на функцию декоратором."""
+        @QueryBudget(queries=1)
+        def read():
+            return list(Post.objects.all())
+
+        self.assertEqual(len(read()), 3)
@@ -0,0 +1,79 @@
+import re
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.queries import QueryRecorder, explain
+
+from ..models import Comment, Follow, Group, Post, User
+
+# Полный просмотр таблицы (без индекса) и сортировка во временном B-дереве.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class QueryPlanTest(TestCase):
+    """Запросы страниц не должны деградировать до полного просмотра."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(15):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}')
+        cls.post = post
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.reader, text=f'Ответ {number}')
+            for number in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def urls(self):
+        index = reverse('posts:index')
+        group = reverse('posts:group_list', args=[self.group.slug])
+        profile = reverse('posts:profile', args=[self.author.username])
+        follow = reverse('posts:follow_index')
+        pages = {}
+        for url in (index, group, profile, follow):
+            response = self.reader_client.get(url)
+            cursor = response.context['paginator'].next_cursor
+            pages[url] = [url, f'{url}?cursor={cursor}', f'{url}?page=2']
+        detail = self.reader_client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        comments = reverse('posts:post_comments', args=[self.post.pk])
+        cursor = detail.context['comments_paginator'].next_cursor
+        pages['detail'] = [
+            reverse('posts:post_detail', args=[self.post.pk]),
+            f'{comments}?cursor={cursor}',
+        ]
+        return sum(pages.values(), [])
+
+    def test_views_use_indexes(self):
+        """Запросы лент, поста и комментариев идут по индексам."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                cache.clear()
+                with QueryRecorder() as recorder:
+                    self.reader_client.get(url)
+                for query in recorder.queries:
+                    if not query.sql.lstrip().upper().startswith('SELECT'):
+                        continue
+                    plan = explain(query.sql, query.params, query.alias)
+                    problems = [
+                        step for step in plan
+                        if FULL_SCAN.match(step) or TEMP_SORT in step
+                    ]
+                    self.assertFalse(
+                        problems,
+                        f'{query.sql}\n' + '\n'.join(plan),
+                    )
@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..paginators import encode_cursor
+from ..models import Post, User
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.often = Post.objects.create(
+            author=cls.author, text='Котики, котики и ещё раз котики')
+        cls.once = Post.objects.create(
+            author=cls.author, text='Один котик среди собак и попугаев')
+        cls.other = Post.objects.create(
+            author=cls.author, text='Пост про погоду')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_search_ranks_and_follows_edits(self):
+        """Поиск ранжирует совпадения и видит правки и удаления."""
+        posts, _ = search.search('котик', 10)
+        self.assertEqual(posts, [self.often, self.once])
+        edited = Post.objects.get(pk=self.other.pk)
+        edited.text = 'Котик на погоде'
+        edited.save()
+        Post.objects.filter(pk=self.once.pk).delete()
+        posts, _ = search.search('котик', 10)
+        self.assertEqual(set(posts), {self.often, self.other})
+        self.assertEqual(search.search('попугаев', 10), ([], None))
+
+    def test_search_pages_by_cursor(self):
+        """Курсор поиска проходит по всем результатам без повторов."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Котик номер {number}')
+            for number in range(5)
+        )
+        seen, cursor = [], None
+        while True:
+            posts, cursor = search.search('котик', 2, cursor)
+            seen += posts
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_broken_cursor_opens_first_page(self):
+        """Курсор с неподходящими значениями открывает первую страницу."""
+        cursors = (
+            encode_cursor([-1.0, 2 ** 70]),
+            encode_cursor(['не число', 1]),
+            encode_cursor([-1.0, 'не число']),
+            encode_cursor([None, 1.5]),
+            encode_cursor([-1.0]),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('posts:search'), {'q': 'котик', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['posts'],
+                                 [self.often, self.once])
+
+    def test_operators_in_query_are_treated_as_text(self):
+        """Синтаксис FTS5 в строке поиска не ломает запрос."""
+        posts, _ = search.search('раз" котики*(', 10)
+        self.assertEqual(posts, [self.often])
+
+    def test_search_view_and_admin_use_index(self):
+        """Страница поиска и поиск в админке находят посты по индексу."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'погоду'})
+        self.assertEqual(response.context['posts'], [self.other])
+        model_admin = site._registry[Post]
+        queryset, _ = model_admin.get_search_results(
+            RequestFactory().get('/'), Post.objects.all(), 'котик')
+        self.assertIn(search.TABLE, str(queryset.query))
+        self.assertEqual(set(queryset), {self.often, self.once})
+
+    def test_reindex_command_restores_index(self):
+        """Команда reindex_search заполняет индекс заново."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.TABLE}({search.TABLE}) "
+                "VALUES ('delete-all')")
+        self.assertEqual(search.search('погоду', 10), ([], None))
+        call_command('reindex_search', batch=2, stdout=StringIO())
+        self.assertEqual(search.search('погоду', 10)[0], [self.other])
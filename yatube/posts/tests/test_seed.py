@@ -0,0 +1,82 @@
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import loadtest
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class SeedDatasetTest(TestCase):
+    def seed(self, **options):
+        options = {'users': 30, 'groups': 3, 'posts': 200, 'comments': 100,
+                   'follows': 3, 'batch': 50, **options}
+        call_command('seed_dataset', stdout=StringIO(), **options)
+
+    def test_creates_consistent_dataset(self):
+        """Набор данных создаётся вместе со счётчиками и лентами."""
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        follow = Follow.objects.filter(author__posts__isnull=False).first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(
+                author__following__user=follow.user).count())
+        author = Post.objects.first().author
+        self.assertEqual(author.counters.posts_count, author.posts.count())
+
+    def test_author_activity_is_skewed(self):
+        """Самый активный автор пишет заметно больше среднего."""
+        self.seed()
+        counts = Counter(Post.objects.values_list('author_id', flat=True))
+        self.assertGreater(max(counts.values()), 200 / 30 * 3)
+
+    def test_same_seed_gives_same_posts(self):
+        """Одинаковый seed даёт одинаковые данные."""
+        self.seed(users=5, posts=10, comments=0)
+        first = list(Post.objects.order_by('pub_date').values_list(
+            'author__username', 'text'))
+        Post.objects.all().delete()
+        self.seed(users=5, posts=10, comments=0)
+        second = list(Post.objects.order_by('pub_date').values_list(
+            'author__username', 'text'))
+        self.assertEqual(first, second)
+
+
+class LoadTestTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_dataset', users=10, groups=2, posts=30,
+                     comments=10, follows=3, stdout=StringIO())
+
+    def test_requests_cover_url_patterns(self):
+        """План запросов проходит по всем страницам без ошибок."""
+        planner = loadtest.Planner(seed=1)
+        requests = planner.plan(100)
+        results, elapsed = loadtest.run(requests)
+        rows = {row['name']: row for row in
+                loadtest.summarize(results, elapsed)}
+        self.assertEqual(set(rows), set(loadtest.MIX))
+        self.assertEqual(sum(row['errors'] for row in rows.values()), 0)
+        for row in rows.values():
+            self.assertLessEqual(row['p50'], row['p95'])
+            self.assertLessEqual(row['p95'], row['p99'])
+
+    def test_follow_feed_is_requested_logged_in(self):
+        """Лента подписок запрашивается с сессией и отдаёт 200."""
+        planner = loadtest.Planner(seed=1)
+        request = planner.request('posts:follow_index')
+        self.assertTrue(request.cookie)
+        (_, status, _), = loadtest.run([request])[0]
+        self.assertEqual(status, 200)
+
+    def test_percentile_uses_nearest_rank(self):
+        """Перцентиль считается по ближайшему рангу."""
+        timings = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(timings, 50), 50)
+        self.assertEqual(loadtest.percentile(timings, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
@@ -0,0 +1,96 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from core.cache import LOCK_KEY, get_or_compute
+
+locks = caches['shared']
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value='новое', delay=0):
+        def compute():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return compute
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи пересчитывают значение один раз."""
+        results = []
+        compute = self.compute(delay=0.2)
+
+        def read():
+            results.append(get_or_compute('key', compute, 60))
+
+        threads = [threading.Thread(target=read) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['новое'] * 5)
+
+    def test_expired_value_served_while_locked(self):
+        """Пока другой запрос пересчитывает запись, отдаётся прежняя."""
+        cache.set('key', ('старое', time.time() - 1, 0.0), 60)
+        locks.add(LOCK_KEY.format('key'), 'другой', 10)
+        value = get_or_compute('key', self.compute(), 60)
+        self.assertEqual(value, 'старое')
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_value_recomputed_by_lock_owner(self):
+        """Истёкшую запись пересчитывает тот, кто взял блокировку."""
+        cache.set('key', ('старое', time.time() - 1, 0.0), 60)
+        value = get_or_compute('key', self.compute(), 60)
+        self.assertEqual(value, 'новое')
+        self.assertEqual(cache.get('key')[0], 'новое')
+        self.assertIsNone(locks.get(LOCK_KEY.format('key')))
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_waiter_computes_when_nothing_stored(self):
+        """Без прежнего значения ожидание ограничено CACHE_LOCK_WAIT."""
+        locks.add(LOCK_KEY.format('key'), 'другой', 10)
+        self.assertEqual(get_or_compute('key', self.compute(), 60), 'новое')
+
+    def test_uncacheable_values_not_stored(self):
+        """Значения, отвергнутые cacheable, не сохраняются."""
+        get_or_compute('key', self.compute(), 60, cacheable=lambda v: False)
+        get_or_compute('key', self.compute(), 60, cacheable=lambda v: False)
+        self.assertEqual(self.calls, 2)
+
+    def test_early_recompute(self):
+        """При beta > 0 дорогое значение пересчитывается до срока."""
+        cache.set('key', ('старое', time.time() + 100, 10.0), 200)
+        with mock.patch('core.cache.random.random', return_value=0.999999):
+            self.assertEqual(
+                get_or_compute('key', self.compute(), 60, beta=0), 'старое')
+            self.assertEqual(
+                get_or_compute('key', self.compute(), 60, beta=1), 'новое')
+
+    def test_fragment_tag(self):
+        """Тег cache из safe_cache кэширует фрагмент и отдаёт старую копию."""
+        template = Template(
+            '{% load safe_cache %}'
+            '{% cache 60 fragment name %}{{ value }}{% endcache %}')
+
+        def render(value):
+            return template.render(Context({'name': 'a', 'value': value}))
+
+        self.assertEqual(render(1), '1')
+        self.assertEqual(render(2), '1')
+        key = make_template_fragment_key('fragment', ['a'])
+        cache.set(key, ('1', time.time() - 1, 0.0), 60)
+        locks.add(LOCK_KEY.format(key), 'другой', 10)
+        self.assertEqual(render(3), '1')
+        locks.delete(LOCK_KEY.format(key))
+        self.assertEqual(render(4), '4')
@@ -0,0 +1,129 @@
+import json
+import logging.handlers
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import slowlog
+
+from ..models import Post, User
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def logged(self, action):
+        with self.assertLogs('core.slowlog', 'WARNING') as logs:
+            action()
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_entry_holds_plan_and_redacted_params(self):
+        """Запись содержит план и типы параметров вместо значений."""
+        entries = self.logged(lambda: list(
+            Post.objects.filter(text='секрет', author_id=self.author.pk)))
+        found, = [item for item in entries if 'posts_post' in item['sql']]
+        self.assertCountEqual(found['params'], ['<str:6>', '<int>'])
+        self.assertNotIn('секрет', json.dumps(found, ensure_ascii=False))
+        self.assertTrue(found['plan'])
+        self.assertEqual(found['fingerprint'],
+                         slowlog.fingerprint(found['sql']))
+
+    def test_entry_holds_view_and_template_line(self):
+        """Запись знает view и строку шаблона, откуда пришёл запрос."""
+        entries = self.logged(
+            lambda: Client().get(reverse('posts:index')))
+        views = {item['view'] for item in entries}
+        self.assertIn('posts:index', views)
+        self.assertTrue(any(item['template'] for item in entries))
+
+    def test_fast_queries_are_not_logged(self):
+        """Запросы быстрее порога в журнал не попадают."""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=10_000):
+            with self.assertRaises(AssertionError):
+                self.logged(lambda: list(Post.objects.all()))
+        self.assertIn(slowlog.record_slow, connection.execute_wrappers)
+
+
+class SlowQueryAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'slow.log')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, *entries):
+        with open(path, 'w', encoding='utf-8') as log:
+            for sql, duration in entries:
+                log.write(json.dumps({
+                    'time': '2026-01-01T00:00:00+00:00',
+                    'duration_ms': duration,
+                    'fingerprint': slowlog.fingerprint(sql),
+                    'sql': sql, 'params': [], 'alias': 'default',
+                    'view': 'posts:index', 'path': '/',
+                    'template': 'posts/index.html:5',
+                    'plan': ['SCAN posts_post'],
+                }) + '\n')
+
+    def test_groups_by_fingerprint_across_rotated_files(self):
+        """Записи из всех файлов группируются по форме запроса."""
+        self.write(self.path + '.1',
+                   ('SELECT * FROM posts_post WHERE id = 1', 150))
+        self.write(self.path,
+                   ('SELECT * FROM posts_post WHERE id = 2', 250),
+                   ('SELECT * FROM posts_group', 120))
+        with override_settings(SLOW_QUERY_LOG=self.path):
+            groups = slowlog.grouped(slowlog.read_entries())
+        self.assertEqual([group['count'] for group in groups], [2, 1])
+        self.assertEqual(groups[0]['total_ms'], 400)
+        self.assertEqual(groups[0]['max_ms'], 250)
+
+    def test_reads_file_renamed_by_logrotate(self):
+        """После переименования файла запись идёт в новый, читаются оба."""
+        handler = logging.handlers.WatchedFileHandler(
+            self.path, encoding='utf-8')
+        try:
+            for number in range(2):
+                handler.emit(logging.makeLogRecord({'msg': json.dumps({
+                    'fingerprint': 'f', 'duration_ms': 100 + number,
+                })}))
+                if not number:
+                    os.rename(self.path, self.path + '.1')
+        finally:
+            handler.close()
+        with override_settings(SLOW_QUERY_LOG=self.path):
+            self.assertEqual(slowlog.log_files(),
+                             [self.path + '.1', self.path])
+            self.assertEqual(
+                [item['duration_ms'] for item in slowlog.read_entries()],
+                [100, 101])
+
+    def test_admin_page_is_staff_only(self):
+        """Страница журнала доступна только в админке."""
+        self.write(self.path, ('SELECT * FROM posts_group', 120))
+        url = reverse('slow_queries')
+        with override_settings(SLOW_QUERY_LOG=self.path):
+            self.assertEqual(Client().get(url).status_code, 302)
+            client = Client()
+            client.force_login(self.admin)
+            response = client.get(url)
+        self.assertContains(response, 'SCAN posts_post')
+        self.assertContains(response, 'posts/index.html:5')
@@ -0,0 +1,134 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import QueryRecorder
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def run_on_commit(self):
+        # TestCase не фиксирует транзакцию, поэтому отложенные
+        # обработчики вызываются вручную.
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for _, callback in callbacks:
+            callback()
+
+    def upload(self, name):
+        return SimpleUploadedFile(name, SMALL_GIF, content_type='image/gif')
+
+    def test_create_generates_every_geometry_after_commit(self):
+        """Создание поста с картинкой заранее готовит все миниатюры."""
+        self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'image': self.upload('new.gif')},
+        )
+        post = Post.objects.get()
+        self.assertIsNone(thumbnails.lookup(post.image, 'feed'))
+        self.run_on_commit()
+        for name in thumbnails.GEOMETRIES:
+            with self.subTest(geometry=name):
+                ready = thumbnails.lookup(post.image, name)
+                self.assertEqual(
+                    sum(map(len, ready.files.values())),
+                    len(list(thumbnails.variants(name))))
+                for files in ready.files.values():
+                    for _, thumbnail in files:
+                        self.assertTrue(thumbnail.exists())
+
+    def test_templates_do_not_generate_thumbnails(self):
+        """Страница без готовой миниатюры отдаёт оригинал, не создавая её."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=self.upload('old.gif'))
+        response = self.author_client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, post.image.url)
+        self.assertIsNone(thumbnails.lookup(post.image, 'card'))
+        self.run_on_commit()
+        response = self.author_client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(
+            response, thumbnails.lookup(post.image, 'card').url)
+
+    def test_cached_pages_switch_to_thumbnails(self):
+        """Страница, закэшированная с оригиналом, получает миниатюру."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=self.upload('late.gif'))
+        self.run_on_commit()
+        guest_client = Client()
+        url = reverse('posts:post_detail', args=[post.pk])
+        self.assertContains(guest_client.get(url), post.image.url)
+        self.run_on_commit()
+        self.assertContains(
+            guest_client.get(url), thumbnails.lookup(post.image, 'card').url)
+
+    def test_feed_page_reads_thumbnails_in_one_query(self):
+        """Миниатюры страницы ленты читаются из хранилища одним запросом."""
+        for number in range(3):
+            post = Post.objects.create(
+                author=self.author, text=f'Пост {number}',
+                image=self.upload(f'feed_{number}.gif'))
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        url = reverse('posts:profile', args=[self.author.username])
+        for expected in (1, 0):
+            with self.subTest(cached=not expected):
+                with QueryRecorder() as recorder:
+                    response = self.author_client.get(url)
+                kvstore_queries = [
+                    query for query in recorder.queries
+                    if 'thumbnail_kvstore' in query.sql
+                ]
+                self.assertEqual(len(kvstore_queries), expected)
+        for post in response.context['page_obj']:
+            self.assertContains(response, post.thumbnails['card'].url)
+
+    def test_card_lists_every_width_in_srcset(self):
+        """Карточка поста перечисляет все ширины миниатюры в srcset."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=self.upload('wide.gif'))
+        thumbnails.generate(post.image.name)
+        response = self.author_client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        ready = thumbnails.lookup(post.image, 'card')
+        self.assertContains(response, f'srcset="{ready.srcset}"')
+        for width in thumbnails.WIDTHS:
+            self.assertIn(f' {width}w', ready.srcset)
+        for mime_type, srcset in ready.sources:
+            self.assertContains(
+                response, f'<source type="{mime_type}" srcset="{srcset}"')
@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def entries(self):
+        return set(TimelineEntry.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        """Подписка переносит посты автора в ленту, отписка убирает."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(self.entries(), {self.old_post.pk})
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.entries(), set())
+
+    @override_settings(TIMELINE_BATCH_SIZE=2)
+    def test_new_post_fans_out_to_every_follower(self):
+        """Новый пост раскладывается в ленты всех подписчиков пачками."""
+        readers = [
+            User.objects.create_user(username=f'reader_{number}')
+            for number in range(5)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=self.author) for reader in readers)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(), len(readers))
+
+    def test_follow_index_reads_timeline_in_order(self):
+        """Лента подписок выводит посты из ленты от новых к старым."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        newest = Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [newest, self.old_post])
+
+    def test_rebuild_command_repairs_timeline(self):
+        """Команда rebuild_timelines восстанавливает ленту по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command(
+            'rebuild_timelines', self.reader.username, stdout=StringIO())
+        self.assertEqual(self.entries(), {self.old_post.pk})
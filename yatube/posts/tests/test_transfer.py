@@ -0,0 +1,150 @@
+import datetime as dt
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def export(self, kind, file_format='ndjson'):
+        path = self.path(f'{kind}.{file_format}')
+        call_command('export_posts', kind=kind, format=file_format,
+                     output=path, chunk_size=2, stderr=StringIO())
+        return path
+
+    def load(self, path, kind, **options):
+        out = StringIO()
+        call_command('import_posts', path, kind=kind, batch=2, stdout=out,
+                     **options)
+        return out.getvalue()
+
+    def test_round_trip_restores_rows_and_derived_data(self):
+        """Выгрузка и загрузка восстанавливают данные и счётчики."""
+        published = timezone.now() - dt.timedelta(days=3)
+        posts = [
+            Post.objects.create(author=self.author, group=self.group,
+                                text=f'Котик номер {number}')
+            for number in range(3)
+        ]
+        Post.objects.filter(pk=posts[0].pk).update(pub_date=published)
+        comment = Comment.objects.create(
+            post=posts[1], author=self.reader, text='Да')
+        Comment.objects.filter(pk=comment.pk).update(created=published)
+        Follow.objects.create(user=self.reader, author=self.author)
+        files = {kind: self.export(kind)
+                 for kind in ('posts', 'comments', 'follows')}
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        self.assertIn('Загружено: 3', self.load(files['posts'], 'posts'))
+        # Посты разложены по лентам с датой из файла, а не временем загрузки.
+        self.assertEqual(TimelineEntry.objects.get(
+            user=self.reader, post_id=posts[0].pk).pub_date, published)
+        Follow.objects.all().delete()
+        TimelineEntry.objects.all().delete()
+        self.load(files['comments'], 'comments')
+        self.load(files['follows'], 'follows')
+
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)),
+            [post.pk for post in posts])
+        self.assertEqual(Post.objects.get(pk=posts[0].pk).pub_date,
+                         published)
+        self.assertEqual(Post.objects.get(pk=posts[1].pk).comment_count, 1)
+        self.assertEqual(Comment.objects.get().created, published)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 3)
+        self.author.counters.refresh_from_db()
+        self.assertEqual(
+            (self.author.counters.posts_count,
+             self.author.counters.followers_count), (3, 1))
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(len(search.search('котик', 10)[0]), 3)
+        new = Post.objects.create(author=self.author, text='Новый')
+        self.assertGreater(new.pub_date, published)
+
+    def test_csv_import_resolves_references(self):
+        """CSV: неизвестные авторы пропускаются или создаются по флагу."""
+        path = self.path('posts.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(
+                'id,author,group,text,pub_date,image\n'
+                ',author,group,Первый,2021-05-01T10:00:00,\n'
+                ',author,,Второй,,\n'
+                ',stranger,,Чужой,,\n'
+            )
+        self.assertIn('Загружено: 2, пропущено: 1', self.load(path, 'posts'))
+        self.assertEqual(
+            Post.objects.get(text='Первый').pub_date,
+            dt.datetime(2021, 5, 1, 10, tzinfo=dt.timezone.utc))
+        self.assertIn('Загружено: 3', self.load(
+            path, 'posts', create_missing=True))
+        self.assertTrue(User.objects.filter(username='stranger').exists())
+
+    def test_repeated_import_skips_existing_ids(self):
+        """Повторная загрузка той же выгрузки не дублирует посты."""
+        Post.objects.create(author=self.author, text='Пост')
+        path = self.export('posts', 'csv')
+        self.assertIn('Загружено: 0, пропущено: 1 (уже были в базе: 1)',
+                      self.load(path, 'posts'))
+        self.assertEqual(Post.objects.count(), 1)
+
+    def write(self, name, lines):
+        path = self.path(name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(''.join(f'{line}\n' for line in lines))
+        return path
+
+    def test_new_ids_skip_explicit_ids_of_batch(self):
+        """Новые id выдаются после явных id из той же пачки."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        path = self.write('posts.ndjson', [
+            '{"author": "author", "text": "Без id"}',
+            f'{{"id": {post.pk + 1}, "author": "author", "text": "С id"}}',
+        ])
+        self.assertIn('Загружено: 2', self.load(path, 'posts'))
+        self.assertEqual(Post.objects.get(pk=post.pk + 1).text, 'С id')
+        self.assertEqual(Post.objects.get(text='Без id').pk, post.pk + 2)
+
+    def test_foreign_row_with_same_id_stops_import(self):
+        """Чужая запись с тем же id останавливает загрузку с ошибкой."""
+        post = Post.objects.create(author=self.author, text='Местный')
+        path = self.write('comments.ndjson', [
+            f'{{"id": {post.pk}, "author": "reader", "text": "Чужой"}}',
+        ])
+        with self.assertRaisesMessage(CommandError, f'id {post.pk}'):
+            self.load(path, 'posts')
+        self.assertEqual(Post.objects.get().text, 'Местный')
+
+    def test_large_batches_fit_database_limits(self):
+        """Пачка транзакции больше лимита вставки SQLite загружается."""
+        path = self.path('posts.ndjson')
+        with open(path, 'w', encoding='utf-8') as file:
+            for number in range(600):
+                file.write(f'{{"author": "author", "text": "{number}"}}\n')
+        call_command('import_posts', path, batch=1000, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 600)
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 from django import forms
@@ -197,6 +198,11 @@ class PaginatorViewsTest(TestCase):
             for item in range(13)
         ])
 
+    def setUp(self):
+        # bulk_create не отправляет сигналы, поэтому счётчики постов
+        # в кэше могли остаться от предыдущих тестов.
+        cache.clear()
+
     def test_paginator_for_index_profile_group(self):
         """Паджинатор на страницах index, profile, group работает корректно."""
         first_page_len = FILL
@@ -0,0 +1,250 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import metrics
+
+from .cache import FEED, bump_version
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Все миниатюры, которые выводят шаблоны постов, в наибольшем размере.
+GEOMETRIES = {
+    'feed': ('960x339', {'crop': 'top', 'upscale': True}),
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Ширины для srcset: браузер выбирает наименьшую достаточную.
+WIDTHS = (320, 640, 960)
+# JPEG остаётся запасным вариантом для браузеров без WebP; WebP
+# готовится, только если Pillow собран с его поддержкой.
+FORMATS = ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+FALLBACK_FORMAT = 'JPEG'
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class Variants:
+    """Готовые варианты одной миниатюры по форматам и ширинам."""
+
+    def __init__(self):
+        self.files = {}
+
+    def add(self, image_format, width, thumbnail):
+        self.files.setdefault(image_format, []).append((width, thumbnail))
+
+    def srcset_for(self, image_format):
+        return ', '.join(
+            f'{thumbnail.url} {width}w'
+            for width, thumbnail in sorted(self.files.get(image_format, ()))
+        )
+
+    @property
+    def url(self):
+        return max(self.files[FALLBACK_FORMAT])[1].url
+
+    @property
+    def srcset(self):
+        return self.srcset_for(FALLBACK_FORMAT)
+
+    @property
+    def sources(self):
+        """Пары (MIME-тип, srcset) для тегов <source> кроме запасного."""
+        return [
+            (MIME_TYPES[image_format], self.srcset_for(image_format))
+            for image_format in FORMATS
+            if image_format != FALLBACK_FORMAT and image_format in self.files
+        ]
+
+
+def complete_options(options):
+    """Полный набор опций, как его дополняет sorl-thumbnail.
+
+    От опций зависит имя файла миниатюры, поэтому они должны совпадать
+    с теми, что sorl-thumbnail подставит сам при генерации.
+    """
+    options = dict(options)
+    for key, value in default.backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in default.backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def variants(name):
+    """Формат, ширина, геометрия и опции каждого варианта миниатюры."""
+    size, options = GEOMETRIES[name]
+    width, height = map(int, size.split('x'))
+    for variant_width in WIDTHS:
+        if variant_width > width:
+            continue
+        geometry = f'{variant_width}x{round(height * variant_width / width)}'
+        for image_format in FORMATS:
+            yield (image_format, variant_width, geometry,
+                   dict(options, format=image_format))
+
+
+def thumbnail_file(image, geometry, options):
+    """Файл миниатюры, под которым sorl-thumbnail её сохранит."""
+    thumbnail_name = default.backend._get_thumbnail_filename(
+        ImageFile(image), geometry, complete_options(options))
+    return ImageFile(thumbnail_name, default.storage)
+
+
+def _read_many(keys):
+    """Читает записи хранилища sorl-thumbnail пачкой.
+
+    Кэш опрашивается одним get_many, промахи добираются одним
+    запросом к таблице хранилища и тоже кладутся в кэш.
+    """
+    kvstore = default.kvstore
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fetched)
+    return {
+        key: deserialize_image_file(value)
+        for key, value in values.items() if value != EMPTY_VALUE
+    }
+
+
+def _read(files):
+    if isinstance(default.kvstore, KVStore):
+        found = _read_many([add_prefix(file.key) for file in files])
+        return {file.key: found.get(add_prefix(file.key)) for file in files}
+    return {file.key: default.kvstore.get(file) for file in files}
+
+
+def resolve(images, name):
+    """Готовые варианты миниатюр для картинок одним чтением хранилища.
+
+    Возвращает словарь «имя картинки — Variants или None»; картинки,
+    у которых не хватает вариантов, ставятся в очередь на генерацию.
+    """
+    wanted = {
+        image.name: [
+            (image_format, width, thumbnail_file(image, geometry, options))
+            for image_format, width, geometry, options in variants(name)
+        ]
+        for image in images if image
+    }
+    found = _read([
+        file for files in wanted.values() for _, _, file in files])
+    resolved = {}
+    for image_name, files in wanted.items():
+        ready = Variants()
+        for image_format, width, file in files:
+            if found[file.key] is not None:
+                ready.add(image_format, width, found[file.key])
+        if sum(map(len, ready.files.values())) < len(files):
+            schedule(image_name)
+        if FALLBACK_FORMAT not in ready.files:
+            ready = None
+        resolved[image_name] = ready
+    return resolved
+
+
+def lookup(image, name):
+    """Возвращает готовые варианты миниатюры или None, ничего не генерируя."""
+    return resolve([image], name).get(image.name)
+
+
+def prefetch(posts, name):
+    """Находит готовые миниатюры для всех постов страницы разом.
+
+    Результат кладётся в post.thumbnails[name]: Variants или None, если
+    запасного варианта ещё нет.
+    """
+    posts = list(posts)
+    resolved = resolve([post.image for post in posts], name)
+    for post in posts:
+        if not hasattr(post, 'thumbnails'):
+            post.thumbnails = {}
+        post.thumbnails[name] = resolved.get(post.image.name)
+
+
+def generate(image_name):
+    """Создаёт все варианты миниатюр картинки, пропуская уже готовые."""
+    started = time.perf_counter()
+    source = ImageFile(image_name, Post.image.field.storage)
+    for name in GEOMETRIES:
+        for _, _, geometry, options in variants(name):
+            get_thumbnail(source, geometry, **options)
+    metrics.observe('yatube_thumbnail_seconds',
+                    time.perf_counter() - started)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def _run(image_name):
+    try:
+        generate(image_name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image_name)
+    else:
+        # Пока миниатюр не было, страницы с картинкой закэшированы
+        # с оригиналом; все они зависят от версии ленты.
+        bump_version(FEED)
+    finally:
+        with _lock:
+            _pending.discard(image_name)
+
+
+def _work(image_name):
+    try:
+        _run(image_name)
+    finally:
+        # Соединения потока-обработчика не должны оставаться открытыми.
+        connections.close_all()
+
+
+def _submit(image_name):
+    with _lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    if settings.THUMBNAIL_WORKERS:
+        get_executor().submit(_work, image_name)
+    else:
+        _run(image_name)
+
+
+def schedule(image_name):
+    """Ставит генерацию миниатюр в очередь после фиксации транзакции.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу в текущем потоке.
+    """
+    if image_name:
+        transaction.on_commit(lambda: _submit(image_name))
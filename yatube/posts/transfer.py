@@ -0,0 +1,365 @@
+"""Потоковые выгрузка и загрузка постов, комментариев и подписок.
+
+Строки читаются и пишутся по одной (NDJSON или CSV), поэтому память не
+зависит от размера таблиц. Загрузка идёт пачками: авторы и группы
+пачки находятся одним запросом, записи создаются ``bulk_create``
+в отдельной транзакции на пачку. Сигналы при этом не отправляются,
+поэтому то, что они поддерживают — счётчики, ленты подписок, ссылки на
+картинки, версии кэша, — обновляется здесь же, по пачке целиком.
+Миниатюры не создаются: для них есть ``manage.py generate_thumbnails``.
+"""
+import csv
+import json
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, counts, images, timeline
+from .cache import (
+    COMMENTS, FEED, FOLLOWS, bump_on_commit, bump_version, comments_scope)
+from .models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+POSTS = 'posts'
+COMMENTS_KIND = 'comments'
+FOLLOWS_KIND = 'follows'
+# Колонки файла и соответствующие им выражения values_list().
+COLUMNS = {
+    POSTS: (
+        ('id', 'id'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('image', 'image'),
+    ),
+    COMMENTS_KIND: (
+        ('id', 'id'),
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('created', 'created'),
+    ),
+    FOLLOWS_KIND: (
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    ),
+}
+MODELS = {POSTS: Post, COMMENTS_KIND: Comment, FOLLOWS_KIND: Follow}
+FORMATS = ('ndjson', 'csv')
+
+
+def columns(kind):
+    return [name for name, _ in COLUMNS[kind]]
+
+
+def export_rows(kind, chunk_size):
+    """Строки таблицы по первичному ключу; в памяти не больше пачки."""
+    names = columns(kind)
+    rows = MODELS[kind].objects.order_by('pk').values_list(
+        *[lookup for _, lookup in COLUMNS[kind]])
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {
+            name: value.isoformat() if hasattr(value, 'isoformat') else value
+            for name, value in zip(names, row)
+        }
+
+
+def write(rows, stream, kind, file_format):
+    written = 0
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, columns(kind))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+        return written
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        written += 1
+    return written
+
+
+def read(stream, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def value(row, name):
+    """Значение колонки; пустая строка CSV считается отсутствующей."""
+    found = row.get(name)
+    return None if found in ('', None) else found
+
+
+def number(row, name):
+    found = value(row, name)
+    return None if found is None else int(found)
+
+
+# Поля, по которым строка файла и строка базы с тем же id считаются
+# одной и той же записью.
+SAME_ROW = {
+    Post: ('author_id', 'text'),
+    Comment: ('post_id', 'author_id', 'text'),
+}
+
+
+class ImportConflict(Exception):
+    """id из файла занят в базе другой записью."""
+
+
+def new_rows(model, objects):
+    """Объекты, чьих ключей ещё нет в базе.
+
+    Строку, уже загруженную раньше, повторная загрузка пропускает. Если
+    же id занят другой записью, загрузка останавливается: иначе строки,
+    ссылающиеся на этот id (комментарии к посту), попали бы к чужой
+    записи.
+    """
+    ids = {obj.pk for obj in objects if obj.pk is not None}
+    if not ids:
+        return objects
+    fields = SAME_ROW[model]
+    existing = {
+        pk: values for pk, *values in model.objects.filter(
+            pk__in=ids).values_list('pk', *fields)
+    }
+    for obj in objects:
+        if obj.pk in existing and existing[obj.pk] != [
+                getattr(obj, field) for field in fields]:
+            raise ImportConflict(
+                f'{model.__name__} с id {obj.pk} уже есть в базе '
+                f'и не совпадает со строкой файла.')
+    return [obj for obj in objects if obj.pk not in existing]
+
+
+def parse_date(text):
+    """Дата из файла; None — пусть её проставит auto_now_add."""
+    parsed = parse_datetime(text) if text else None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def create_keeping_dates(model, objects, name):
+    """bulk_create, после которого даты из файла возвращаются в строки.
+
+    Поле с auto_now_add при вставке получает текущее время, поэтому
+    даты из файла записываются вторым запросом, bulk_update.
+    """
+    dates = [(obj, getattr(obj, name)) for obj in objects
+             if getattr(obj, name) is not None]
+    model.objects.bulk_create(objects)
+    for obj, date in dates:
+        setattr(obj, name, date)
+    model.objects.bulk_update([obj for obj, _ in dates], [name])
+
+
+class Lookup:
+    """Ключи объектов по имени, находимые пачкой и запоминаемые."""
+
+    def __init__(self, model, field, create=None):
+        self.model = model
+        self.field = field
+        self.create = create
+        self.known = {}
+
+    def resolve(self, names):
+        missing = {name for name in names if name} - set(self.known)
+        if missing:
+            self.fetch(missing)
+            still_missing = missing - set(self.known)
+            if still_missing and self.create:
+                self.model.objects.bulk_create(
+                    [self.create(name) for name in still_missing],
+                    ignore_conflicts=True,
+                )
+                self.fetch(still_missing)
+        return self.known
+
+    def fetch(self, names):
+        self.known.update(self.model.objects.filter(
+            **{f'{self.field}__in': names}).values_list(self.field, 'pk'))
+
+
+def new_user(username):
+    return User(username=username, password=make_password(None))
+
+
+def new_group(slug):
+    return Group(slug=slug, title=slug, description='')
+
+
+def assign_ids(model, objects):
+    """Проставляет ключи, если база не возвращает их из bulk_create.
+
+    Без ключей нельзя ни разложить посты по лентам, ни вернуть строкам
+    даты из файла, поэтому новые ключи выдаются после текущего
+    максимума. Загрузка рассчитана на время, когда посты и комментарии
+    не создаются параллельно.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return
+    pending = [obj for obj in objects if obj.pk is None]
+    if pending:
+        # Явные id той же пачки тоже заняты, хотя в базе их ещё нет.
+        last = max([
+            model.objects.aggregate(last=Max('pk'))['last'] or 0,
+            *(obj.pk for obj in objects if obj.pk is not None),
+        ])
+        for number, obj in enumerate(pending, start=last + 1):
+            obj.pk = number
+
+
+class Importer:
+    def __init__(self, batch_size, create_missing=False):
+        self.batch_size = batch_size
+        self.users = Lookup(
+            User, 'username', new_user if create_missing else None)
+        self.groups = Lookup(
+            Group, 'slug', new_group if create_missing else None)
+        self.created = 0
+        self.skipped = 0
+        # Пропущенные строки, которые уже были в базе с тем же id.
+        self.existing = 0
+
+    def run(self, kind, rows):
+        handle = {
+            POSTS: self.posts,
+            COMMENTS_KIND: self.comments,
+            FOLLOWS_KIND: self.follows,
+        }[kind]
+        try:
+            for batch in batches(rows, self.batch_size):
+                with transaction.atomic():
+                    handle(batch)
+        finally:
+            # Пачки до ошибки уже сохранены.
+            bump_version({
+                POSTS: FEED, COMMENTS_KIND: COMMENTS, FOLLOWS_KIND: FOLLOWS,
+            }[kind])
+        return self.created, self.skipped
+
+    def fresh(self, model, objects):
+        found = new_rows(model, objects)
+        self.existing += len(objects) - len(found)
+        return found
+
+    def keep(self, objects, batch):
+        self.created += len(objects)
+        self.skipped += len(batch) - len(objects)
+
+    def posts(self, batch):
+        authors = self.users.resolve(value(row, 'author') for row in batch)
+        groups = self.groups.resolve(value(row, 'group') for row in batch)
+        posts = []
+        for row in batch:
+            group = value(row, 'group')
+            if value(row, 'author') not in authors or (
+                    group is not None and group not in groups):
+                continue
+            posts.append(Post(
+                pk=number(row, 'id'),
+                author_id=authors[row['author']],
+                group_id=groups.get(group),
+                text=row.get('text') or '',
+                pub_date=parse_date(value(row, 'pub_date')),
+                image=value(row, 'image') or '',
+            ))
+        posts = self.fresh(Post, posts)
+        assign_ids(Post, posts)
+        create_keeping_dates(Post, posts, 'pub_date')
+        self.keep(posts, batch)
+        scopes = Counter(
+            scope for post in posts for scope in counts.scopes_for(post))
+        for scope, total in scopes.items():
+            counts.adjust([scope], total)
+        for author_id, total in Counter(p.author_id for p in posts).items():
+            counters.shift_user(author_id, posts_count=total)
+        for group_id, total in Counter(p.group_id for p in posts).items():
+            counters.shift_group(group_id, total)
+        for name, total in Counter(p.image.name for p in posts
+                                   if p.image).items():
+            images.retain(name, total)
+        self.fan_out(posts)
+
+    def fan_out(self, posts):
+        followers = defaultdict(list)
+        for author_id, user_id in Follow.objects.filter(
+                author_id__in={post.author_id for post in posts}
+        ).values_list('author_id', 'user_id'):
+            followers[author_id].append(user_id)
+        timeline._insert([
+            TimelineEntry(user_id=user_id, post_id=post.pk,
+                          pub_date=post.pub_date)
+            for post in posts for user_id in followers[post.author_id]
+        ])
+
+    def comments(self, batch):
+        authors = self.users.resolve(value(row, 'author') for row in batch)
+        post_ids = set(Post.objects.filter(
+            pk__in={number(row, 'post') for row in batch}
+        ).values_list('pk', flat=True))
+        comments = self.fresh(Comment, [
+            Comment(
+                pk=number(row, 'id'),
+                post_id=number(row, 'post'),
+                author_id=authors[row['author']],
+                text=row.get('text') or '',
+                created=parse_date(value(row, 'created')),
+            )
+            for row in batch
+            if value(row, 'author') in authors
+            and number(row, 'post') in post_ids
+        ])
+        assign_ids(Comment, comments)
+        create_keeping_dates(Comment, comments, 'created')
+        self.keep(comments, batch)
+        for post_id, total in Counter(c.post_id for c in comments).items():
+            counters.shift_post(post_id, total)
+            bump_on_commit(comments_scope(post_id))
+
+    def follows(self, batch):
+        users = self.users.resolve(
+            value(row, name) for row in batch for name in ('user', 'author'))
+        pairs = {
+            (users[row['user']], users[row['author']]) for row in batch
+            if value(row, 'user') in users and value(row, 'author') in users
+            and row['user'] != row['author']
+        }
+        existing = set(Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            author_id__in={author_id for _, author_id in pairs},
+        ).values_list('user_id', 'author_id'))
+        follows = [
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs - existing
+        ]
+        Follow.objects.bulk_create(follows)
+        self.keep(follows, batch)
+        for user_id, total in Counter(f.user_id for f in follows).items():
+            counters.shift_user(user_id, following_count=total)
+        for author_id, total in Counter(f.author_id for f in follows).items():
+            counters.shift_user(author_id, followers_count=total)
+        for follow in follows:
+            timeline.backfill(follow.user_id, follow.author_id)
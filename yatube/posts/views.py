@@ -1,77 +1,163 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth import get_user_model
 from django.shortcuts import redirect
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.views.decorators.http import condition
 
+from core.pagecache import cache_anonymous
+
+from .cache import COMMENTS, FEED, get_versions
+from .conditional import (
+    feed_etag, feed_versions, post_detail_etag, post_versions, profile_etag,
+    profile_versions)
 from .models import Follow, Group, Post
 from .forms import PostForm, CommentForm
+from .counters import counters_for
+from .counts import ALL, author_scope, group_scope
+from .paginators import (
+    CachedCountPaginator, CountedPaginator, CursorPaginator)
+from .search import search as search_posts
+from .thumbnails import schedule as schedule_thumbnails
+from .timeline import feed
 
 User = get_user_model()
 
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, settings.FILL)
+def get_page_context(queryset, request, ordering=('-pub_date', '-id'),
+                     count_scope=None, count_queryset=None):
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    cursor = request.GET.get('cursor')
+    # Старые ссылки вида ?page=N продолжают работать через OFFSET.
+    if settings.FEED_PAGINATION == 'cursor' and page_number is None:
+        paginator = CursorPaginator(queryset, settings.FILL, ordering)
+        page_obj = paginator.get_page(cursor)
+    elif count_scope is not None:
+        paginator = CachedCountPaginator(
+            queryset, settings.FILL, count_scope, count_queryset)
+        page_obj = paginator.get_page(page_number)
+    else:
+        paginator = CountedPaginator(queryset, settings.FILL, count_queryset)
+        page_obj = paginator.get_page(page_number)
     return {
         'paginator': paginator,
         'page_number': page_number,
+        'cursor': cursor,
         'page_obj': page_obj,
     }
 
 
+@cache_anonymous(feed_versions)
+@condition(etag_func=feed_etag)
 def index(request):
-    posts = Post.objects.all()
-    context = get_page_context(posts, request)
+    posts = Post.objects.for_feed()
+    context = get_page_context(posts, request, count_scope=ALL)
+    # Карточки показывают число комментариев, поэтому фрагмент зависит
+    # и от версии комментариев.
+    context.update({
+        'feed_version': '-'.join(get_versions([FEED, COMMENTS])),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    })
     return render(request, 'posts/index.html', context)
 
 
+@cache_anonymous(feed_versions)
+@condition(etag_func=feed_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
 
-    posts = group.group_posts.all()
+    posts = group.group_posts.for_feed()
     context = {
         'group': group,
     }
-    context.update(get_page_context(posts, request))
+    context.update(
+        get_page_context(posts, request, count_scope=group_scope(group.pk)))
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_anonymous(profile_versions)
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
+    posts = author.posts.for_feed()
+    author_counters = counters_for(author)
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author).exists()
     context = {
         'author': author,
         'posts': posts,
+        'count_user_posts': author_counters.posts_count,
+        'counters': author_counters,
+        'following': following,
     }
-    context.update(get_page_context(posts, request))
+    context.update(
+        get_page_context(posts, request, count_scope=author_scope(author.pk)))
     return render(request, 'posts/profile.html', context)
 
 
+@cache_anonymous(post_versions)
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__counters'),
+        id=post_id)
     comment_form = CommentForm(request.POST or None)
-    comments = post.comments.all()
-    post_count = post.author.posts.all().count()
+    post_count = counters_for(post.author).posts_count
     context = {
         'post_count': post_count,
         'post': post,
         'comment_form': comment_form,
-        'comments': comments,
     }
+    context.update(get_comments_context(post, None))
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments_context(post, cursor):
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'id'),
+    )
+    return {
+        'comments': paginator.get_page(cursor),
+        'comments_paginator': paginator,
+    }
+
+
+def post_comments(request, post_id):
+    post = get_object_or_404(Post, id=post_id)
+    context = {'post': post}
+    context.update(get_comments_context(post, request.GET.get('cursor')))
+    # Кнопка «Показать ещё» догружает только список, без страницы.
+    if request.is_ajax():
+        return render(request, 'includes/comment_list.html', context)
+    return render(request, 'posts/post_comments.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = search_posts(
+        query, settings.FILL, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     template = 'posts/create_post.html'
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnails(post.image.name)
         return redirect('posts:profile', username=post.author)
     context = {
         'form': form,
@@ -80,6 +166,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = PostForm(
@@ -89,6 +176,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid() and post.author == request.user:
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post.image.name)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -99,6 +188,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -112,12 +202,15 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request,):
-    posts = Post.objects.filter(author__following__user=request.user)
-    context = get_page_context(posts, request)
+    posts = feed(request.user)
+    context = get_page_context(
+        posts, request, ordering=('-feed_date', '-feed_post'),
+        count_queryset=request.user.timeline.all())
     return render(request, "posts/follow.html", context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -126,6 +219,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     follow_obj = Follow.objects.filter(author=author, user=request.user)
@@ -45,7 +45,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RepeatedQueriesMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,6 +62,19 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Отдача медиафайлов: None — сам Django; 'x-accel-redirect' (nginx)
+# или 'x-sendfile' (Apache, lighttpd) — файл отдаёт фронт-сервер.
+MEDIA_ACCEL = None
+# internal-location nginx, смотрящий в MEDIA_ROOT.
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Для файлов без хэша в имени: их содержимое может смениться.
+MEDIA_CACHE_MAX_AGE = 60 * 60
+# Загрузки хэшируются по мере приёма, чтобы хранилище картинок
+# сохраняло их под хэшем содержимого без повторного чтения.
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.HashingMemoryFileUploadHandler',
+    'core.uploads.HashingTemporaryFileUploadHandler',
+]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -137,11 +154,110 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 FILL = 10
+# Потоки, в которых создаются миниатюры загруженных картинок;
+# 0 — создавать сразу, в потоке запроса (так в yatube.test_settings).
+THUMBNAIL_WORKERS = 2
+COMMENTS_PER_PAGE = 20
+# 'cursor' — постраничный вывод лент по курсору (pub_date, id),
+# 'offset' — классический Paginator с ?page=N.
+FEED_PAGINATION = 'cursor'
+# Кэш страниц ленты сбрасывается сменой версии при изменении постов,
+# поэтому сами записи могут жить долго.
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+# Целые страницы для анонимных посетителей; 0 — выключить. Версии
+# сбрасывают их при изменении постов, комментариев и подписок, а срок
+# ограничивает то, что версиями не отслеживается (например, имена).
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Счётчики постов в кэше. В приблизительном режиме при промахе кэша
+# точно считаются лишь первые COUNT_APPROXIMATE_THRESHOLD строк.
+COUNT_CACHE_TIMEOUT = 60 * 60 * 24
+COUNT_APPROXIMATE = False
+COUNT_APPROXIMATE_THRESHOLD = 100_000
+
+# Пересчёт истёкших записей кэша одним запросом (core.cache). Остальные
+# до CACHE_LOCK_WAIT секунд ждут новое значение или сразу получают
+# прежнее: оно хранится ещё CACHE_STALE_GRACE секунд после срока.
+# CACHE_EARLY_RECOMPUTE_BETA > 0 включает вероятностный пересчёт до
+# истечения срока (обычно 1); 0 — только по сроку.
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 2
+CACHE_STALE_GRACE = 60
+CACHE_EARLY_RECOMPUTE_BETA = 0
+
+# Поиск повторяющихся запросов (N+1) — только для разработки и стенда.
+NPLUSONE_DETECTION = DEBUG
+NPLUSONE_THRESHOLD = 3
+
+# Метрики для Prometheus на /metrics (только для персонала). Воркер
+# раз в METRICS_FLUSH_INTERVAL секунд кладёт свой снимок в кэш
+# METRICS_CACHE, общий для всех процессов. Снимок умершего воркера
+# исчезает через METRICS_WORKER_TIMEOUT секунд.
+METRICS_ENABLED = True
+METRICS_CACHE = 'metrics'
+METRICS_FLUSH_INTERVAL = 10
+METRICS_WORKER_TIMEOUT = 60 * 60 * 24
+
+# Журнал SQL-запросов дольше порога (None — выключить) с планом
+# EXPLAIN QUERY PLAN; в админке он сгруппирован по форме запроса.
+# В файл дописывают все воркеры, поэтому ротирует его не Django, а
+# logrotate (без copytruncate и сжатия свежей копии): WatchedFileHandler
+# после переименования сам открывает новый файл. Админка читает и
+# SLOW_QUERY_LOG_BACKUPS последних копий.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.log')
+SLOW_QUERY_LOG_BACKUPS = 5
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'core.slowlog': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Процессы-воркеры делят кэш в файле SQLite, а чаще читаемое держат
+# ещё и в памяти процесса (core.cache_backends). Тесты держат общий
+# кэш в памяти (yatube.test_settings).
+CACHE_FILE = os.path.join(BASE_DIR, 'cache.sqlite3')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+            'POLL_INTERVAL': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_FILE,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Только снимки метрик: общий кэш мог бы вытеснить счётчик номеров
+    # воркеров, и процессы стали бы писать друг поверх друга.
+    'metrics': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'metrics.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
@@ -0,0 +1,30 @@
+"""Настройки для тестов: то же, что в settings, без следов на диске."""
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, LOGGING
+
+# Общий кэш и кэш метрик — базы SQLite в памяти процесса, общие для
+# его потоков.
+CACHES = {
+    **CACHES,
+    'shared': {
+        **CACHES['shared'],
+        'LOCATION': 'file:yatube-tests?mode=memory&cache=shared',
+    },
+    'metrics': {
+        **CACHES['metrics'],
+        'LOCATION': 'file:yatube-tests-metrics?mode=memory&cache=shared',
+    },
+}
+
+# Тесты подменяют MEDIA_ROOT на временный каталог, и фоновые потоки
+# миниатюр могли бы его пережить.
+THUMBNAIL_WORKERS = 0
+
+# Медленные запросы тесты проверяют через assertLogs, а не по файлу.
+LOGGING = {
+    **LOGGING,
+    'handlers': {
+        **LOGGING['handlers'],
+        'slow_queries': {'class': 'logging.NullHandler'},
+    },
+}
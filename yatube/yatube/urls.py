@@ -1,14 +1,29 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.media import serve as serve_media
+from core.views import metrics, slow_queries
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path(
+        'admin/slow-queries/',
+        admin.site.admin_view(slow_queries),
+        name='slow_queries',
+    ),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
+    path('metrics', metrics, name='metrics'),
+    re_path(
+        r'^{}(?P<path>.*)$'.format(settings.MEDIA_URL.lstrip('/')),
+        serve_media,
+        name='media',
+    ),
 ]
 
 handler404 = 'core.views.page_not_found'
@@ -16,7 +31,5 @@ handler500 = 'core.views.server_error'
 handler403 = 'core.views.permission_denied'
 
 if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(
         settings.STATIC_URL, document_root=settings.STATIC_ROOT)